@@ -0,0 +1,191 @@
+import argparse
+import csv
+import errno
+import glob
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import sys
+import time
+from collections import deque
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import solver
+from dimacs import read_dimacs
+from verify import verify
+
+FIELDS = ['file', 'status', 'verified', 'time'] + solver.STATS + ['error']
+CNF_SUFFIXES = ('.cnf', '.cnf.gz', '.cnf.bz2', '.cnf.xz')
+# seconds an instance is given past its timeout to stop on its own before it is killed
+TIMEOUT_GRACE = 1.0
+
+def find_instances(paths):
+    """
+    :param paths: cnf files, directories (searched for cnf files) or glob patterns
+    :return: list of files, in order
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith(CNF_SUFFIXES)))
+        else:
+            # a path matching nothing is kept, to be reported as an error
+            files.extend(sorted(glob.glob(path)) or [path])
+    return files
+
+def _run(path, mode, memory, seed, timeout, small_formula_vars, conn):
+    if hasattr(os, 'setsid'):
+        # own process group, so that the workers of modes 5 and 7 are killed along with the instance
+        os.setsid()
+    if memory and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    config = solver.Config(seed, decision_mode=mode, small_formula_vars=small_formula_vars)
+    stats = dict.fromkeys(solver.STATS, 0)
+    result = {}
+    start = time.time()
+    try:
+        db, n, k = read_dimacs(path)
+        stats['time_parse'] = time.time() - start
+        # the instance stops on its own at the timeout, the kill is only a fallback
+        budget = solver.Budget(time=timeout) if timeout else None
+        A, is_sat = solver.solve(db, n, k, stats, budget=budget, config=config)
+        # the only limit of the budget is the timeout
+        result['status'] = ('TIMEOUT' if timeout else 'UNKNOWN') if is_sat is None else 'SAT' if is_sat else 'UNSAT'
+        if is_sat:
+            # the model is checked against the input clauses, which solve leaves as they are
+            result['verified'] = not verify(db, k, A)
+    except MemoryError:
+        result['status'] = 'MEMOUT'
+    except OSError as e:
+        # mmap and the allocations of numpy report the memory limit as ENOMEM
+        result['status'] = 'MEMOUT' if e.errno == errno.ENOMEM else 'ERROR'
+        result['error'] = repr(e)
+    except Exception as e:
+        result['status'] = 'ERROR'
+        result['error'] = repr(e)
+    result['time'] = round(time.time() - start, 3)
+    result.update(stats)
+    conn.send(result)
+    conn.close()
+
+def _kill(process):
+    # kill the instance and the processes it started
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        except (ProcessLookupError, PermissionError):
+            # the instance has not made its group yet, or is gone
+            pass
+    process.kill()
+
+def run_batch(files, jobs, timeout = 0, memory = 0, mode = None, on_result = None, seed = None,
+              small_formula_vars = 0):
+    """
+    solve every file in its own process, with at most jobs processes at a time.
+    :param timeout: wall clock seconds per instance, 0 for no limit
+    :param memory: bytes of address space per instance, 0 for no limit
+    :param mode: DECISION_MODE of the instances, the current one by default
+    :param on_result: called with the result dict of every instance as soon as it is done
+    :param seed: seed of the random decisions of every instance, none by default
+    :param small_formula_vars: instances with at most this many variables are solved by the bit mask dpll
+    whatever the mode (see SMALL_FORMULA_VARS), 0 for never, so that the mode is the one measured
+    :return: list of the result dicts, in order of completion
+    """
+    mode = solver.DECISION_MODE if mode is None else mode
+    ctx = multiprocessing.get_context()
+    pending = deque(files)
+    # {connection : (file, process, start time)}
+    running = {}
+    results = []
+    try:
+        while pending or running:
+            while pending and len(running) < jobs:
+                path = pending.popleft()
+                recv, send = ctx.Pipe(duplex=False)
+                process = ctx.Process(target=_run, args=(path, mode, memory, seed, timeout, small_formula_vars, send))
+                process.start()
+                send.close()
+                running[recv] = (path, process, time.time())
+
+            ready = multiprocessing.connection.wait(list(running), timeout=0.1)
+            now = time.time()
+            for conn in list(running):
+                path, process, start = running[conn]
+                if conn in ready:
+                    try:
+                        result = conn.recv()
+                    except EOFError:
+                        # the process died without an answer
+                        result = {'status': 'ERROR', 'time': round(now - start, 3),
+                                  'error': f"exit code {process.exitcode}"}
+                elif timeout and now - start > timeout + TIMEOUT_GRACE:
+                    _kill(process)
+                    result = {'status': 'TIMEOUT', 'time': round(now - start, 3)}
+                else:
+                    continue
+                process.join()
+                conn.close()
+                del running[conn]
+                result = {'file': path, **result}
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+    finally:
+        for _, process, _ in running.values():
+            _kill(process)
+            process.join()
+    return results
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="solve cnf files in parallel, one process per instance")
+    parser.add_argument('paths', nargs='+', help="cnf files, directories or glob patterns")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="instances solved at a time (default : num of cores)")
+    parser.add_argument('-t', '--timeout', type=float, default=60,
+                        help="wall clock seconds per instance, 0 for no limit (default : 60)")
+    parser.add_argument('-m', '--memory', type=int, default=0,
+                        help="MB of memory per instance, 0 for no limit (default : 0)")
+    parser.add_argument('--mode', type=int, default=solver.DECISION_MODE, choices=sorted(solver.decisions),
+                        help=f"decision mode (default : {solver.DECISION_MODE})")
+    parser.add_argument('--small-formula-vars', type=int, default=0,
+                        help="solve instances with at most this many variables by the bit mask dpll "
+                             "whatever the mode, 0 for never (default : 0)")
+    parser.add_argument('-f', '--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('-o', '--output', default='-', help="output file, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    files = find_instances(args.paths)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    if args.format == 'csv':
+        # the time of every phase is only in the json lines
+        writer = csv.DictWriter(out, fieldnames=FIELDS, restval='', extrasaction='ignore')
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        write = lambda result: out.write(json.dumps(result) + "\n")
+
+    def on_result(result):
+        write(result)
+        out.flush()
+
+    try:
+        results = run_batch(files, args.jobs, args.timeout, args.memory * 1024 * 1024, args.mode, on_result,
+                            small_formula_vars=args.small_formula_vars)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    statuses = [result['status'] for result in results]
+    summary = ", ".join(f"{status} {statuses.count(status)}" for status in sorted(set(statuses)))
+    print(f"{len(files)} instances : {summary}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
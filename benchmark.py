@@ -0,0 +1,178 @@
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+
+import solver
+from batch import find_instances, run_batch
+
+# the bundled formulas
+CORPUS = ['sat_inputs', 'sat_inputs_small', 'input1.cnf', 'input2.cnf',
+          '6_SAT.cnf', '7_UNSAT.cnf', '8_UNSAT.cnf', '9_SAT.cnf']
+MODES = sorted(solver.decisions)
+SEEDS = 3
+# a mode regresses when its par-2 score or its median time grows by more than this
+# fraction of the baseline, plus REGRESSION_SLACK seconds for the noise of short runs
+REGRESSION_TOLERANCE = 0.25
+REGRESSION_SLACK = 0.05
+
+def expected_status(path):
+    # the answer given by the name of the file, if any
+    name = os.path.basename(path).upper()
+    if 'UNSAT' in name:
+        return 'UNSAT'
+    if 'SAT' in name:
+        return 'SAT'
+    return None
+
+def percentile(values, p):
+    # nearest rank, None without values
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+def summarize(results, timeout):
+    """
+    :param results: result dicts of run_batch for one mode
+    :return: dict of the metrics of the mode. times of unsolved runs count as 2 * timeout in par2
+    """
+    solved = [r for r in results if r['status'] in ('SAT', 'UNSAT')]
+    times = [r['time'] for r in solved]
+    penalty = 2 * timeout if timeout else max(times, default=0)
+    search_time = sum(r.get('time_search', 0) for r in solved)
+    summary = {
+        'runs': len(results),
+        'solved': len(solved),
+        'median': statistics.median(times) if times else None,
+        'p95': percentile(times, 95),
+        'par2': sum(r['time'] if r['status'] in ('SAT', 'UNSAT') else penalty
+                    for r in results) / len(results) if results else None,
+    }
+    for name in ('conflicts', 'propagations'):
+        total = sum(r.get(name, 0) for r in solved)
+        summary[f"{name}/s"] = round(total / search_time) if search_time else None
+    return summary
+
+def validate(results, expected):
+    """
+    check every answer against the expected status of its file, the other answers for it
+    and its model.
+    :param expected: {file : 'SAT' / 'UNSAT'}, updated with the answers of the files missing from it
+    :return: list of error messages
+    """
+    errors = []
+    for r in results:
+        status = r['status']
+        if status not in ('SAT', 'UNSAT'):
+            if status not in ('TIMEOUT', 'UNKNOWN'):
+                errors.append(f"{r['file']} (mode {r['mode']}, seed {r['seed']}) : {status} {r.get('error', '')}")
+            continue
+        if status == 'SAT' and not r.get('verified'):
+            errors.append(f"{r['file']} (mode {r['mode']}, seed {r['seed']}) : model does not satisfy the formula")
+        want = expected.setdefault(r['file'], status)
+        if status != want:
+            errors.append(f"{r['file']} (mode {r['mode']}, seed {r['seed']}) : answered {status}, expected {want}")
+    return errors
+
+def compare(summaries, baseline):
+    """
+    :param summaries: {mode name : summary} of this run
+    :param baseline: {mode name : summary} saved by an earlier run
+    :return: list of regression messages
+    """
+    regressions = []
+    for name, summary in summaries.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        unsolved, old_unsolved = summary['runs'] - summary['solved'], old['runs'] - old['solved']
+        if unsolved > old_unsolved:
+            regressions.append(f"{name} : {unsolved} runs unsolved, {old_unsolved} in the baseline")
+        for metric in ('par2', 'median'):
+            if summary[metric] is None or old[metric] is None:
+                continue
+            limit = old[metric] * (1 + REGRESSION_TOLERANCE) + REGRESSION_SLACK
+            if summary[metric] > limit:
+                regressions.append(f"{name} : {metric} {summary[metric]:.3f} s, "
+                                   f"{old[metric]:.3f} s in the baseline")
+    return regressions
+
+def run_benchmark(files, modes, seeds, jobs = 1, timeout = 60, expected = None):
+    """
+    solve every file with every mode and seed, in separate processes (see run_batch).
+    :param expected: {file : 'SAT' / 'UNSAT'} known answers, found from the file names otherwise
+    :return: ({mode name : summary}, {file : answer}, list of error messages)
+    """
+    expected = dict(expected or {})
+    for path in files:
+        status = expected_status(path)
+        if status is not None:
+            expected.setdefault(path, status)
+    summaries = {}
+    errors = []
+    for mode in modes:
+        results = []
+        for seed in range(seeds):
+            # the small formulas are solved in the mode measured, not by the bit mask dpll
+            for result in run_batch(files, jobs, timeout, mode=mode, seed=seed, small_formula_vars=0):
+                results.append({'mode': mode, 'seed': seed, **result})
+        errors.extend(validate(results, expected))
+        summaries[solver.decisions[mode]] = summarize(results, timeout)
+    return summaries, expected, errors
+
+def print_summaries(summaries, file = None):
+    file = sys.stdout if file is None else file
+    columns = ['runs', 'solved', 'median', 'p95', 'par2', 'conflicts/s', 'propagations/s']
+    print(f"{'mode':<18}" + "".join(f"{column:>15}" for column in columns), file=file)
+    for name, summary in summaries.items():
+        cells = []
+        for column in columns:
+            value = summary[column]
+            cells.append(f"{'-' if value is None else round(value, 3):>15}")
+        print(f"{name:<18}" + "".join(cells), file=file)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="benchmark the decision modes over cnf corpora, "
+                                                 "and check for regressions against a baseline")
+    parser.add_argument('paths', nargs='*', default=CORPUS,
+                        help="cnf files, directories or glob patterns (default : the bundled formulas)")
+    parser.add_argument('--modes', type=int, nargs='+', default=MODES, choices=sorted(solver.decisions))
+    parser.add_argument('-s', '--seeds', type=int, default=SEEDS, help=f"runs per mode (default : {SEEDS})")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="instances solved at a time (default : 1, so that times do not interfere)")
+    parser.add_argument('-t', '--timeout', type=float, default=60,
+                        help="wall clock seconds per instance (default : 60)")
+    parser.add_argument('-b', '--baseline', help="json baseline to compare with")
+    parser.add_argument('--save', help="save the results as a json baseline")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    files = find_instances(args.paths)
+    summaries, expected, errors = run_benchmark(files, args.modes, args.seeds, args.jobs, args.timeout,
+                                                baseline.get('expected'))
+    print_summaries(summaries)
+
+    regressions = compare(summaries, baseline.get('modes', {}))
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'timeout': args.timeout, 'seeds': args.seeds, 'modes': summaries,
+                       'expected': expected}, file, indent=2)
+
+    for message in errors:
+        print(f"WRONG ANSWER {message}", file=sys.stderr)
+    for message in regressions:
+        print(f"REGRESSION {message}", file=sys.stderr)
+    if errors or regressions:
+        print(f"{len(errors)} wrong answers, {len(regressions)} regressions", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import logging
+import time
+
+from solver import ClauseDB, Assignment, Budget, Config, STATS, TYPE_DECISION, memory_usage
+
+# search nodes between two checks of the time and memory budgets
+BIT_BUDGET_CHECK = 1024
+
+log = logging.getLogger('solver.bits')
+
+def clause_masks(db : ClauseDB):
+    """
+    :return: list of (pos, neg) of the input clauses of db, the bit ind of pos (neg) being set
+    if the clause has the literal ind (-ind). tautologies are left out.
+    """
+    clauses = []
+    for cref in range(len(db)):
+        if db.learnt[cref]:
+            continue
+        pos = neg = 0
+        for lit in db.literalsOf(cref):
+            if lit & 1:
+                neg |= 1 << (lit >> 1)
+            else:
+                pos |= 1 << (lit >> 1)
+        if not pos & neg:
+            clauses.append((pos, neg))
+    return clauses
+
+def propagate(clauses, true, false, units_true, units_false):
+    """
+    assign the units and the ones they imply.
+    the clauses are kept simplified : without the satisfied ones, nor the false literals of the others.
+    :param clauses: (pos, neg) masks over the unassigned variables
+    :param true: mask of the variables assigned true
+    :param false: mask of the variables assigned false
+    :param units_true: mask of the variables to assign true
+    :param units_false: mask of the variables to assign false
+    :return: (clauses, true, false, num of assignments) after propagation, or None on a conflict
+    """
+    assigned = 0
+    while units_true | units_false:
+        if units_true & units_false:
+            return None
+        true |= units_true
+        false |= units_false
+        assigned += (units_true | units_false).bit_count()
+        simplified = []
+        units_true = units_false = 0
+        for pos, neg in clauses:
+            if pos & true or neg & false:
+                continue
+            pos &= ~false
+            neg &= ~true
+            both = pos | neg
+            if not both & (both - 1):
+                # at most one literal left
+                if not both:
+                    return None
+                if pos:
+                    units_true |= pos
+                else:
+                    units_false |= neg
+                continue
+            simplified.append((pos, neg))
+        clauses = simplified
+    return clauses, true, false, assigned
+
+def branch(clauses):
+    """
+    :return: (bit, 0) for a positive literal, or (0, bit) for a negative one : the literal occurring
+    the most in the binary clauses, or the first literal of the first clause if none is binary
+    """
+    counts = {}
+    for pos, neg in clauses:
+        both = pos | neg
+        rest = both & (both - 1)
+        if rest & (rest - 1):
+            continue
+        # the negative literals are counted under the negated mask
+        for lit in (pos & -pos, pos & (pos - 1), -(neg & -neg), -(neg & (neg - 1))):
+            if lit:
+                counts[lit] = counts.get(lit, 0) + 1
+    if not counts:
+        pos, neg = clauses[0]
+        return (pos & -pos, 0) if pos else (0, neg & -neg)
+    lit = max(counts, key=counts.get)
+    return (lit, 0) if lit > 0 else (0, -lit)
+
+def solve_small(db : ClauseDB, n, k, stats = None, budget = None, progress = None, config = None):
+    """
+    dpll over bit masks, for formulas with few variables : a clause is a pair of masks of its
+    positive and negative variables, and a node of the search is the masks of the variables
+    assigned true and false with the clauses it leaves, so that backtracking only drops a node.
+    :param db: clauses
+    :param n: num of clauses
+    :param k: num of variables
+    :param stats: dict filled with the counters of the search (see STATS), if given
+    :param budget: Budget of the search, if given. its interruption, conflicts and propagations are checked
+    at every node, its time and memory every BIT_BUDGET_CHECK nodes
+    :param progress: called with stats every PROGRESS_PERIOD seconds, if given
+    :param config: Config of the search, the module settings by default
+    :return: (Assignments(if satisfiable), isSat (true / false / None if the budget ran out)
+    """
+    start = time.time()
+    config = Config() if config is None else config
+    stats = {} if stats is None else stats
+    stats.update(dict.fromkeys(STATS, 0), time_search=0.0)
+    budget = Budget() if budget is None else budget
+    inf = float('inf')
+    max_conflicts = inf if budget.conflicts is None else budget.conflicts
+    max_propagations = inf if budget.propagations is None else budget.propagations
+    deadline = inf if budget.time is None else start + budget.time
+    next_progress = start + config.progress_period
+    decisions = conflicts = propagations = 0
+    is_sat, true = False, 0
+    stopped = None
+    clauses = clause_masks(db)
+    # the units of the formula are propagated at the root node
+    units_true = units_false = 0
+    empty = False
+    for pos, neg in clauses:
+        both = pos | neg
+        if not both & (both - 1):
+            units_true |= pos
+            units_false |= neg
+            empty = empty or not both
+    stack = [] if empty else [(clauses, 0, 0, units_true, units_false)]
+    # the first node checks the whole budget too
+    ticks = 1
+    while stack:
+        if budget.interrupted or conflicts >= max_conflicts or propagations >= max_propagations:
+            stopped = ('interrupted' if budget.interrupted else f"{budget.conflicts} conflicts"
+                       if conflicts >= max_conflicts else f"{budget.propagations} propagations")
+            break
+        ticks -= 1
+        if not ticks:
+            ticks = BIT_BUDGET_CHECK
+            now = time.time()
+            if now >= deadline:
+                stopped = f"{budget.time:.3f} s"
+                break
+            if budget.memory is not None:
+                memory = memory_usage()
+                if memory is not None and memory >= budget.memory:
+                    stopped = f"{memory} bytes of memory"
+                    break
+            if progress is not None and now >= next_progress:
+                next_progress = now + config.progress_period
+                stats.update(decisions=decisions, conflicts=conflicts, propagations=propagations,
+                             time_search=now - start)
+                progress(stats)
+        node = propagate(*stack.pop())
+        if node is None:
+            conflicts += 1
+            continue
+        clauses, true, false, assigned = node
+        propagations += assigned
+        if not clauses:
+            is_sat = True
+            break
+        # the literal is tried true first, then false
+        decisions += 1
+        bit_true, bit_false = branch(clauses)
+        stack.append((clauses, true, false, bit_false, bit_true))
+        stack.append((clauses, true, false, bit_true, bit_false))
+
+    stats.update(decisions=decisions, conflicts=conflicts, propagations=propagations,
+                 time_search=time.time() - start)
+    log.info(f"bit-parallel dpll : {decisions} decisions, {conflicts} conflicts")
+    if stopped is not None:
+        log.info(f"giving up : {stopped}")
+        return {}, None
+    if not is_sat:
+        return {}, False
+    # the variables left unassigned satisfy every clause with any value
+    return {ind: Assignment(ind, bool(true >> ind & 1), TYPE_DECISION) for ind in range(k)}, True
@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import sqlite3
+import time
+from array import array
+from collections import OrderedDict
+
+import solver
+from solver import ClauseDB, Assignment, TYPE_DECISION
+
+# results kept in memory, and in the on-disk store if any
+CACHE_SIZE = 1024
+CACHE_DISK_SIZE = 1 << 20
+# 'lru' evicts the result used the longest ago, 'fifo' the one stored the longest ago
+CACHE_EVICTION = 'lru'
+# also match formulas which only differ by a renaming of their variables
+CACHE_RENAME = False
+# most rounds of refinement of the colors of the variables, which order them under renaming.
+# the refinement stops earlier once a round splits no color
+CACHE_REFINE_ROUNDS = 16
+
+log = logging.getLogger('solver.cache')
+
+def canonical_clauses(db : ClauseDB, k, rename = False):
+    """
+    the input clauses of db, with their literals deduplicated and sorted, without repeated clauses, sorted.
+    with rename, the variables are renumbered in an order which only depends on where they occur
+    (colors refined as in weisfeiler-leman), so that most renamings of a formula give the same clauses.
+    variables that are still tied keep their relative order, which may only cause a miss.
+    :return: (tuple of clauses as tuples of encoded literals, order : list of the variables of db,
+    the i-th being the variable i of the clauses)
+    """
+    clauses = {tuple(sorted(set(db.literalsOf(cref)))) for cref in range(len(db)) if not db.learnt[cref]}
+    if not rename:
+        return tuple(sorted(clauses)), list(range(k))
+
+    used = sorted({lit >> 1 for clause in clauses for lit in clause})
+    colors = dict.fromkeys(used, 0)
+    num_colors = 0
+    for _ in range(CACHE_REFINE_ROUNDS + 1):
+        signatures = {ind: [] for ind in used}
+        for clause in clauses:
+            clause_colors = tuple(sorted((colors[lit >> 1], lit & 1) for lit in clause))
+            for lit in clause:
+                signatures[lit >> 1].append((lit & 1, clause_colors))
+        signatures = {ind: (colors[ind], tuple(sorted(signature))) for ind, signature in signatures.items()}
+        ranks = {signature: rank for rank, signature in enumerate(sorted(set(signatures.values())))}
+        colors = {ind: ranks[signature] for ind, signature in signatures.items()}
+        if len(ranks) == num_colors:
+            break
+        num_colors = len(ranks)
+
+    order = sorted(used, key=lambda ind: (colors[ind], ind))
+    index = {ind: i for i, ind in enumerate(order)}
+    renamed = {tuple(sorted(2 * index[lit >> 1] | lit & 1 for lit in clause)) for clause in clauses}
+    return tuple(sorted(renamed)), order
+
+def formula_key(clauses, k):
+    """
+    :param clauses: canonical clauses (see canonical_clauses)
+    :param k: num of variables
+    :return: hex sha256 of the clauses
+    """
+    digest = hashlib.sha256(array('q', [k, len(clauses)]).tobytes())
+    for clause in clauses:
+        digest.update(array('i', (len(clause),) + clause).tobytes())
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    answers of solve by formula key : (isSat, values of the variables in canonical order if satisfiable).
+    the last size ones are kept in memory, and every one in an sqlite store at path, if given,
+    which processes can share. unknown answers are never stored.
+    """
+    def __init__(self, size = None, path = None, eviction = None, disk_size = None, rename = None):
+        """
+        :param size: results kept in memory, CACHE_SIZE by default
+        :param path: file of the on-disk store, if any
+        :param eviction: 'lru' or 'fifo', CACHE_EVICTION by default
+        :param disk_size: results kept in the on-disk store, CACHE_DISK_SIZE by default
+        :param rename: whether formulas match under variable renaming, CACHE_RENAME by default
+        """
+        self.size = CACHE_SIZE if size is None else size
+        self.eviction = CACHE_EVICTION if eviction is None else eviction
+        if self.eviction not in ('lru', 'fifo'):
+            raise ValueError(f"unknown eviction policy {self.eviction}")
+        self.disk_size = CACHE_DISK_SIZE if disk_size is None else disk_size
+        self.rename = CACHE_RENAME if rename is None else rename
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            self.db.execute("CREATE TABLE IF NOT EXISTS results "
+                            "(key TEXT PRIMARY KEY, sat INTEGER, model BLOB, used REAL)")
+            self.db.commit()
+
+    def get(self, key):
+        """
+        :return: (isSat, values) stored for key, or None
+        """
+        result = self.results.get(key)
+        if result is not None:
+            if self.eviction == 'lru':
+                self.results.move_to_end(key)
+        elif self.db is not None:
+            row = self.db.execute("SELECT sat, model FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                result = bool(row[0]), bytes(row[1])
+                self.remember(key, result)
+                if self.eviction == 'lru':
+                    self.db.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+                    self.db.commit()
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, key, is_sat, values = b''):
+        """
+        :param values: values of the variables in canonical order (1 for true), if satisfiable
+        """
+        result = bool(is_sat), bytes(values)
+        self.remember(key, result)
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                            (key, int(result[0]), result[1], time.time()))
+            self.db.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used "
+                            "LIMIT max(0, (SELECT count(*) FROM results) - ?))", (self.disk_size,))
+            self.db.commit()
+
+    def remember(self, key, result):
+        # keep result in memory, evicting the oldest one over size
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.size:
+            self.results.popitem(last=False)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def cached_solve(clauses : list | ClauseDB, n, k, cache : ResultCache, stats = None, proof = None,
+                 budget = None, progress = None, config = None):
+    """
+    solve, answering from cache when the same formula (or a renaming of it) was solved before.
+    the model of a cached answer is mapped back to the variables of clauses.
+    a proof cannot be given for a cached answer, so the cache is not used with one.
+    :param cache: ResultCache
+    the other parameters and the return value are as in solver.solve
+    """
+    if proof is not None:
+        return solver.solve(clauses, n, k, stats, proof, budget, progress, config)
+    stats = {} if stats is None else stats
+    db = clauses if isinstance(clauses, ClauseDB) else ClauseDB(clauses)
+    canonical, order = canonical_clauses(db, k, cache.rename)
+    key = formula_key(canonical, len(order))
+    result = cache.get(key)
+    stats['cache_hit'] = result is not None
+    if result is not None:
+        is_sat, values = result
+        log.info(f"cached answer for formula {key[:16]}")
+        if not is_sat:
+            return {}, False
+        A = {ind: Assignment(ind, False, TYPE_DECISION) for ind in range(k)}
+        for i, ind in enumerate(order):
+            A[ind].value = values[i] == 1
+        return A, True
+
+    A, is_sat = solver.solve(db, n, k, stats, None, budget, progress, config)
+    if is_sat is not None:
+        # the variables missing from the model are false, as when it is printed
+        values = bytes(1 if ind in A and A[ind].value else 0 for ind in order) if is_sat else b''
+        cache.put(key, is_sat, values)
+    return A, is_sat
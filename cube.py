@@ -0,0 +1,163 @@
+import logging
+import multiprocessing
+import os
+import math
+from functools import partial
+
+import solver
+import parallel
+from solver import ClauseDB, Trail, Propagator, Assignment, TYPE_DECISION
+
+# decision mode of the cdcl search run on every cube
+CUBE_SEARCH_MODE = solver.DECISION_VSIDS
+# num of processes solving cubes
+CUBE_WORKERS = os.cpu_count() or 1
+# depth of the lookahead splitting, 0 for about 4 cubes per worker
+CUBE_DEPTH = 0
+# variables probed at every split, the ones occurring the most
+LOOKAHEAD_CANDIDATES = 20
+
+log = logging.getLogger('solver.cube')
+
+class Lookahead:
+    """
+    splits the search space into cubes, partial assignments over the variables
+    which imply the most assignments on both sides.
+    a variable with a side that fails by unit propagation gets the other value in the cube
+    without a split, and a cube with a variable that fails on both sides is refuted.
+    """
+    def __init__(self, db : ClauseDB, k):
+        self.trail = Trail()
+        self.propagator = Propagator(db, self.trail, k)
+        occurrences = [0] * k
+        for lit in db.lits:
+            occurrences[lit >> 1] += 1
+        self.candidates = sorted(range(k), key=lambda ind: -occurrences[ind])
+
+    def probe(self, ind, value):
+        # num of assignments implied by ind = value, None on conflict
+        trail = self.trail
+        level = trail.decisionLevel()
+        before = len(trail.order)
+        trail.decide(ind, value)
+        conflict = self.propagator.propagate()
+        implied = len(trail.order) - before
+        self.propagator.cancelUntil(level)
+        return None if conflict is not None else implied
+
+    def assume(self, ind, value):
+        # False if ind = value fails
+        self.trail.decide(ind, value)
+        return self.propagator.propagate() is None
+
+    def cubes(self, depth):
+        """
+        :return: list of cubes (lists of encoded literals), empty if the formula is refuted
+        """
+        cubes = []
+        if self.propagator.propagate() is None:
+            self.split(depth, cubes)
+        return cubes
+
+    def split(self, depth, cubes):
+        trail = self.trail
+        A = trail.A
+        level = trail.decisionLevel()
+        best, best_score = None, -1
+        probed = 0
+        for ind in self.candidates:
+            if probed >= LOOKAHEAD_CANDIDATES or depth == 0:
+                break
+            if ind in A:
+                continue
+            probed += 1
+            t, f = self.probe(ind, True), self.probe(ind, False)
+            if t is None and f is None:
+                self.propagator.cancelUntil(level)
+                return
+            if t is None or f is None:
+                # failed literal. the best variable so far may be assigned by it
+                if not self.assume(ind, t is not None):
+                    self.propagator.cancelUntil(level)
+                    return
+                best, best_score = None, -1
+                continue
+            score = (t + 1) * (f + 1)
+            if score > best_score:
+                best, best_score = ind, score
+
+        if best is None:
+            cubes.append([2 * a.ind + int(not a.value) for a in
+                          (A[ind] for ind in trail.order) if a.assignmentType == TYPE_DECISION])
+        else:
+            for value in (True, False):
+                inner = trail.decisionLevel()
+                if self.assume(best, value):
+                    self.split(depth - 1, cubes)
+                self.propagator.cancelUntil(inner)
+        self.propagator.cancelUntil(level)
+
+def _work(db, n, k, budget, config, cube):
+    config.decision_mode = CUBE_SEARCH_MODE
+    config.seed = 0
+    db = db.copy()
+    # the cube is added as unit clauses
+    for lit in cube:
+        db.add([lit])
+    # the workers do not trace, only the answer is reported
+    solver.log.setLevel(logging.WARNING)
+    stats = {}
+    A, is_sat = solver.search(db, n, k, stats=stats, budget=budget, config=config)
+    return {ind: a.value for ind, a in A.items()}, is_sat, stats
+
+def solve_cubes(db : ClauseDB, n, k, workers = None, stats = None, budget = None, config = None):
+    """
+    cube and conquer : the cubes of a lookahead are solved by cdcl in a process pool.
+    satisfiable as soon as a cube is, unsatisfiable once every cube is refuted.
+    :param db: clauses
+    :param n: num of clauses
+    :param k: num of variables
+    :param workers: num of processes, CUBE_WORKERS by default
+    :param stats: dict filled with the counters summed over the cubes solved, if given
+    :param budget: Budget of the search. its conflicts and propagations are limits per cube,
+    its time and interruption stop every cube
+    :param config: Config the cubes are solved with, in CUBE_SEARCH_MODE
+    :return: (Assignments(if satisfiable), isSat (true / false / None if the budget ran out)
+    """
+    workers = workers or CUBE_WORKERS
+    depth = CUBE_DEPTH or math.ceil(math.log2(4 * workers))
+    cubes = Lookahead(db.copy(), k).cubes(depth)
+    log.info(f"lookahead : {len(cubes)} cubes of depth up to {depth}")
+    stats = {} if stats is None else stats
+    # the counters stay at 0 if the lookahead refutes the formula without cubes
+    stats.update(dict.fromkeys(solver.STATS, 0))
+
+    budget = budget or solver.Budget()
+    config = solver.Config() if config is None else config
+    deadline = parallel.deadline(budget)
+    unknown = 0
+
+    ctx = multiprocessing.get_context()
+    with ctx.Pool(workers) as pool:
+        results = pool.imap_unordered(partial(_work, db, n, k, budget, config), cubes)
+        for solved in range(len(cubes)):
+            result = parallel.wait(results.next, multiprocessing.TimeoutError, budget, deadline)
+            if result is None:
+                # the other cubes are cancelled when leaving the pool
+                log.info(f"giving up after {solved} cubes")
+                return {}, None
+            values, is_sat, cube_stats = result
+            for name, value in cube_stats.items():
+                stats[name] = stats.get(name, 0) + value
+            if is_sat:
+                log.info(f"satisfiable cube found after {solved} others")
+                A = {ind: Assignment(ind, value, TYPE_DECISION) for ind, value in values.items()}
+                return A, True
+            if is_sat is None:
+                unknown += 1
+
+    if unknown:
+        log.info(f"{unknown} cubes of {len(cubes)} unknown, the others refuted")
+        return {}, None
+    log.info(f"every cube of {len(cubes)} refuted")
+    return {}, False
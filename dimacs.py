@@ -0,0 +1,200 @@
+import bz2
+import gzip
+import lzma
+import mmap
+import sys
+import warnings
+from array import array
+
+from solver import ClauseDB
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHUNK_SIZE = 1 << 20
+
+# leading bytes of the compressed formats that can be read
+MAGIC = {
+    b'\x1f\x8b': gzip.open,
+    b'BZh': bz2.open,
+    b'\xfd7zXZ\x00': lzma.open,
+}
+
+def open_dimacs(source):
+    """
+    open a cnf file as a binary stream, decompressing gzip / bz2 / xz input.
+    :param source: path, '-' for stdin, or a binary file object
+    """
+    if source == '-':
+        source = sys.stdin.buffer
+    if hasattr(source, 'read'):
+        head = source.peek(6)[:6] if hasattr(source, 'peek') else b''
+        for magic, opener in MAGIC.items():
+            if head.startswith(magic):
+                return opener(source, 'rb')
+        return source
+
+    with open(source, 'rb') as file:
+        head = file.read(6)
+    for magic, opener in MAGIC.items():
+        if head.startswith(magic):
+            return opener(source, 'rb')
+    file = open(source, 'rb')
+    if head == b'':
+        return file
+    # plain files are read through the page cache without extra copies
+    stream = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    file.close()
+    return stream
+
+def read_dimacs(source = '-'):
+    """
+    :param source: path, '-' for stdin, or a binary file object
+    :return: (ClauseDB, num of clauses, num of variables)
+    """
+    stream = open_dimacs(source)
+    try:
+        return parse_dimacs(stream)
+    finally:
+        if stream is not source and stream is not sys.stdin.buffer:
+            stream.close()
+
+def parse_dimacs(stream):
+    """
+    parse a dimacs cnf from a binary stream, chunk by chunk, into a ClauseDB.
+    a clause may span lines, tokens may be separated by any whitespace,
+    and a line starting with '%' ends the formula.
+    literals are encoded as in Literal.encode, and repeated literals are dropped.
+    :return: (ClauseDB, num of clauses, num of variables)
+    """
+    db = ClauseDB()
+    header = None
+    # encoded literals of a clause not terminated yet
+    pending = []
+    num_vars = 0
+    rest = b''
+    done = False
+
+    while not done:
+        chunk = stream.read(CHUNK_SIZE)
+        if chunk:
+            data = rest + chunk
+            # only whole lines are parsed, so that comments can be told apart
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                rest = data
+                continue
+            data, rest = data[:cut], data[cut:]
+        else:
+            data, rest = rest, b''
+            done = True
+
+        if header is not None and b'c' not in data and b'p' not in data and b'%' not in data:
+            if np is not None:
+                ret = _add_clauses_numpy(db, pending, data)
+                if ret is not None:
+                    pending, chunk_vars = ret
+                    num_vars = max(num_vars, chunk_vars)
+                    continue
+            tokens = data.split()
+        else:
+            tokens = []
+            for line in data.split(b'\n'):
+                words = line.split()
+                if not words:
+                    continue
+                first = words[0][:1]
+                if first == b'c':
+                    continue
+                if first == b'p':
+                    if len(words) != 4 or words[1] != b'cnf':
+                        raise ValueError(f"invalid problem line : {line.decode(errors='replace')}")
+                    header = (int(words[2]), int(words[3]))
+                    continue
+                if first == b'%':
+                    done = True
+                    break
+                tokens.extend(words)
+
+        if tokens:
+            pending, chunk_vars = _add_clauses(db, pending, tokens)
+            num_vars = max(num_vars, chunk_vars)
+
+    # the last clause may miss its terminating 0
+    if pending:
+        pending.append(-1)
+        num_vars = max(num_vars, _add_clauses(db, [], pending)[1])
+
+    if header is not None:
+        num_vars = max(num_vars, header[0])
+    return db, len(db), num_vars
+
+def _add_clauses(db : ClauseDB, pending, tokens):
+    # add the clauses terminated in tokens (dimacs integers as bytes, or encoded
+    # literals with -1 for 0) after the pending literals.
+    # returns the literals left pending and the number of variables seen.
+    if isinstance(tokens[0], bytes):
+        # 0 becomes -1, the clause separator
+        encoded = [2 * v - 2 if v > 0 else -2 * v - 1 for v in map(int, tokens)]
+    else:
+        encoded = tokens
+    if pending:
+        encoded = pending + encoded
+    num_vars = (max(encoded) >> 1) + 1
+
+    lits = []
+    sizes = []
+    pos = 0
+    while True:
+        try:
+            sep = encoded.index(-1, pos)
+        except ValueError:
+            break
+        clause = encoded[pos:sep]
+        if len(set(clause)) < len(clause):
+            clause = list(dict.fromkeys(clause))
+        lits.extend(clause)
+        sizes.append(len(clause))
+        pos = sep + 1
+    db.extend(lits, sizes)
+    return encoded[pos:], num_vars
+
+def _add_clauses_numpy(db : ClauseDB, pending, data):
+    # same as _add_clauses for a chunk of plain dimacs text, vectorized.
+    # returns None if the chunk has to go through _add_clauses.
+    with warnings.catch_warnings():
+        # raised by numpy when it stops at a token which is not an integer
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            values = np.fromstring(data, dtype=np.int64, sep=' ')
+        except (DeprecationWarning, ValueError):
+            return None
+    if len(values) == 0:
+        return pending, 0
+    encoded = np.where(values > 0, 2 * values - 2, -2 * values - 1)
+    if pending:
+        encoded = np.concatenate((np.array(pending, dtype=np.int64), encoded))
+    num_vars = int(encoded.max() >> 1) + 1
+
+    seps = np.flatnonzero(encoded < 0)
+    if len(seps) == 0:
+        return encoded.tolist(), num_vars
+    end = seps[-1] + 1
+    sizes = np.diff(seps, prepend=-1) - 1
+    lits = encoded[:end][encoded[:end] >= 0]
+
+    # drop repeated literals, keeping the first occurrence as dict.fromkeys does
+    clause_of = np.repeat(np.arange(len(sizes)), sizes)
+    key = clause_of * (int(lits.max()) + 1) + lits
+    perm = np.argsort(key, kind='stable')
+    repeated = key[perm][1:] == key[perm][:-1]
+    if repeated.any():
+        # the sort is stable, so the later occurrences are the ones dropped
+        dropped = perm[1:][repeated]
+        sizes = sizes - np.bincount(clause_of[dropped], minlength=len(sizes))
+        lits = np.delete(lits, dropped)
+
+    db.extend(array('i', lits.astype(np.int32).tobytes()), sizes.tolist())
+    return encoded[end:].tolist(), num_vars
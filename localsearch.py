@@ -0,0 +1,257 @@
+import copy
+import logging
+import random
+import time
+
+import solver
+from solver import ClauseDB, Assignment, TYPE_DECISION
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 'probsat' flips a variable of a falsified clause with probability (PROBSAT_EPS + break) ** -PROBSAT_CB,
+# 'walksat' flips one that breaks no clause if any, a random one with probability LOCAL_NOISE,
+# and one that breaks the fewest clauses otherwise
+LOCAL_ALGORITHM = 'probsat'
+LOCAL_NOISE = 0.567
+PROBSAT_CB = 2.06
+PROBSAT_EPS = 0.9
+# flips before a restart from a new random assignment, and tries before solve falls back to cdcl
+LOCAL_MAX_FLIPS = 100000
+LOCAL_TRIES = 3
+# flips between two checks of the time and the interruption of the budget
+LOCAL_BUDGET_CHECK = 1024
+# compute the counts of a new assignment with numpy batches, if numpy is available
+LOCAL_NUMPY = True
+
+log = logging.getLogger('solver.local')
+
+class LocalSearch:
+    """
+    stochastic local search over the input clauses of a ClauseDB.
+    for every clause it keeps the num of true literals and the xor of their variables,
+    which is the variable of the only true literal of a clause with one,
+    so that the break count of every variable (the clauses that a flip would falsify)
+    is kept up to date. occurrences are in csr form : the clauses of the literal lit are
+    occ[occ_start[lit]:occ_start[lit + 1]], so that a flip runs in O(occurrences).
+    """
+    def __init__(self, db : ClauseDB, k, rng = None):
+        """
+        :param rng: random.Random the flips are drawn from, a new one by default
+        """
+        self.k = k
+        self.random = random.Random(random.getrandbits(64)) if rng is None else rng
+        lits = []
+        start = [0]
+        for cref in range(len(db)):
+            if not db.learnt[cref]:
+                lits.extend(db.literalsOf(cref))
+                start.append(len(lits))
+        self.lits = lits
+        self.start = start
+        num_clauses = len(start) - 1
+        self.empty = any(start[c] == start[c + 1] for c in range(num_clauses))
+
+        # counting sort of the clauses by literal
+        counts = [0] * (2 * k + 1)
+        for lit in lits:
+            counts[lit + 1] += 1
+        for lit in range(2 * k):
+            counts[lit + 1] += counts[lit]
+        self.occ_start = list(counts)
+        occ = [0] * len(lits)
+        for c in range(num_clauses):
+            for lit in lits[start[c]:start[c + 1]]:
+                occ[counts[lit]] = c
+                counts[lit] += 1
+        self.occ = occ
+
+        max_occ = max((self.occ_start[lit + 1] - self.occ_start[lit] for lit in range(2 * k)), default=0)
+        # probability weight of every break count
+        self.weights = [(PROBSAT_EPS + b) ** -PROBSAT_CB for b in range(max_occ + 1)]
+        self.flips = 0
+        self.tries = 0
+        self.values = None
+        # whether the budget ran out during the last search
+        self.stopped = False
+
+    def reset(self, values):
+        """
+        start from the assignment values (bytearray, 1 for true).
+        """
+        self.values = values
+        lits, start, k = self.lits, self.start, self.k
+        num_clauses = len(start) - 1
+        if LOCAL_NUMPY and np is not None and num_clauses > 0:
+            lits_np = np.array(lits, dtype=np.int64)
+            inds = lits_np >> 1
+            true = np.frombuffer(values, dtype=np.uint8)[inds] != (lits_np & 1)
+            offsets = np.array(start[:-1], dtype=np.int64)
+            count = np.add.reduceat(true.astype(np.int64), offsets)
+            crit = np.bitwise_xor.reduceat(np.where(true, inds, 0), offsets)
+            self.count = count.tolist()
+            self.crit = crit.tolist()
+            self.breaks = np.bincount(crit[count == 1], minlength=k).tolist()
+            self.unsat = np.flatnonzero(count == 0).tolist()
+        else:
+            self.count = [0] * num_clauses
+            self.crit = [0] * num_clauses
+            self.breaks = [0] * k
+            self.unsat = []
+            for c in range(num_clauses):
+                for lit in lits[start[c]:start[c + 1]]:
+                    if values[lit >> 1] != (lit & 1):
+                        self.count[c] += 1
+                        self.crit[c] ^= lit >> 1
+                if self.count[c] == 1:
+                    self.breaks[self.crit[c]] += 1
+                elif self.count[c] == 0:
+                    self.unsat.append(c)
+        # position of every falsified clause in unsat
+        self.where = [-1] * num_clauses
+        for i, c in enumerate(self.unsat):
+            self.where[c] = i
+
+    def search(self, max_flips, budget = None, deadline = None):
+        """
+        flip variables of falsified clauses until every clause is satisfied.
+        :param budget: Budget whose interruption is checked every LOCAL_BUDGET_CHECK flips, if given
+        :param deadline: time.time() checked along with it, None for none
+        :return: whether the assignment in values satisfies every clause
+        """
+        values, lits, start = self.values, self.lits, self.start
+        occ, occ_start = self.occ, self.occ_start
+        count, crit, breaks = self.count, self.crit, self.breaks
+        unsat, where = self.unsat, self.where
+        weights = self.weights
+        probsat = LOCAL_ALGORITHM == 'probsat'
+        noise = LOCAL_NOISE
+        rand = self.random.random
+        randrange = self.random.randrange
+        check = LOCAL_BUDGET_CHECK if budget is not None else max_flips + 1
+        self.stopped = False
+
+        for flip in range(max_flips):
+            if not unsat:
+                self.flips += flip
+                return True
+            check -= 1
+            if not check:
+                check = LOCAL_BUDGET_CHECK
+                if budget.interrupted or deadline is not None and time.time() >= deadline:
+                    self.flips += flip
+                    self.stopped = True
+                    return False
+            c = unsat[randrange(len(unsat))]
+            clause = lits[start[c]:start[c + 1]]
+
+            if probsat:
+                scores = [weights[breaks[lit >> 1]] for lit in clause]
+                r = rand() * sum(scores)
+                for lit, score in zip(clause, scores):
+                    r -= score
+                    if r <= 0:
+                        break
+                ind = lit >> 1
+            else:
+                best = min(breaks[lit >> 1] for lit in clause)
+                if best > 0 and rand() < noise:
+                    ind = clause[randrange(len(clause))] >> 1
+                else:
+                    ind = self.random.choice([lit >> 1 for lit in clause if breaks[lit >> 1] == best])
+
+            # the literal of ind which becomes true
+            values[ind] ^= 1
+            true_lit = 2 * ind + 1 - values[ind]
+            for d in occ[occ_start[true_lit]:occ_start[true_lit + 1]]:
+                n = count[d] + 1
+                count[d] = n
+                crit[d] ^= ind
+                if n == 1:
+                    # satisfied again
+                    i = where[d]
+                    last = unsat.pop()
+                    if last != d:
+                        unsat[i] = last
+                        where[last] = i
+                    where[d] = -1
+                    breaks[ind] += 1
+                elif n == 2:
+                    # its critical variable can be flipped freely
+                    breaks[crit[d] ^ ind] -= 1
+            false_lit = true_lit ^ 1
+            for d in occ[occ_start[false_lit]:occ_start[false_lit + 1]]:
+                n = count[d] - 1
+                count[d] = n
+                crit[d] ^= ind
+                if n == 0:
+                    where[d] = len(unsat)
+                    unsat.append(d)
+                    breaks[ind] -= 1
+                elif n == 1:
+                    breaks[crit[d]] += 1
+
+        self.flips += max_flips
+        return not unsat
+
+    def walk(self, tries = None, max_flips = None, budget = None):
+        """
+        search from random assignments until one satisfies every clause.
+        :param tries: num of random assignments to start from, None for no limit
+        :param budget: Budget whose time and interruption are checked every LOCAL_BUDGET_CHECK flips, if given
+        :return: values of the model (bytearray, 1 for true), or None if none was found
+        """
+        if self.empty:
+            return None
+        max_flips = max_flips or LOCAL_MAX_FLIPS
+        deadline = time.time() + budget.time if budget is not None and budget.time is not None else None
+        while tries is None or self.tries < tries:
+            if budget is not None and (budget.interrupted or deadline is not None and time.time() >= deadline):
+                return None
+            self.tries += 1
+            self.reset(bytearray(self.random.getrandbits(1) for _ in range(self.k)))
+            if self.search(max_flips, budget, deadline):
+                return self.values
+            if self.stopped:
+                return None
+            log.info(f"local search restarting, {len(self.unsat)} clauses falsified after {self.flips} flips")
+        return None
+
+def model(values):
+    return {ind: Assignment(ind, value == 1, TYPE_DECISION) for ind, value in enumerate(values)}
+
+def solve_local(db : ClauseDB, n, k, stats = None, proof = None, budget = None, progress = None, config = None):
+    """
+    local search for a model, then cdcl (vsids) to refute the formula
+    if none is found in LOCAL_TRIES tries.
+    :param db: clauses
+    :param n: num of clauses
+    :param k: num of variables
+    :param stats: dict filled with the flips and tries of the local search, and the counters of cdcl
+    :param proof: DratWriter for the cdcl search, if given
+    :param budget: Budget of the search, if given. its time is shared by the local search and cdcl
+    :param progress: called with stats every PROGRESS_PERIOD seconds of the cdcl search, if given
+    :param config: Config of the cdcl search, whose generator the local search draws from too
+    :return: (Assignments(if satisfiable), isSat (true / false / None if the budget ran out)
+    """
+    stats = {} if stats is None else stats
+    config = solver.Config() if config is None else config
+    start = time.time()
+    local = LocalSearch(db, k, config.newRandom())
+    values = local.walk(LOCAL_TRIES, budget=budget)
+    elapsed = time.time() - start
+    stats.update(flips=local.flips, tries=local.tries, time_local=elapsed)
+    if values is not None:
+        log.info(f"local search found a model after {local.flips} flips")
+        return model(values), True
+
+    if budget is not None:
+        budget = budget.after(elapsed)
+    log.info("no model found by local search, solving with cdcl")
+    config = copy.copy(config)
+    config.decision_mode = solver.DECISION_VSIDS
+    cdcl = solver.Solver(k, db, n, stats=stats, proof=proof, config=config)
+    is_sat = cdcl.solve(budget=budget, progress=progress)
+    return cdcl.model, is_sat
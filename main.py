@@ -1,48 +1,84 @@
 from solver import *
+from dimacs import read_dimacs
+from proof import DratWriter
+from verify import verify, format_model
+from cache import ResultCache, cached_solve
+import argparse
+import logging
+import signal
 import sys
+import time
 
-if __name__ == '__main__':
-    comments = ""
-    while True:
-        line = sys.stdin.readline().split(" ")
-
-        # comment
-        if line[0] == "c":
-            comments += line[0] + '\n'
-        elif line[0] == "p":
-            # format : p cnf k n
-            assert len(line) == 4
-            assert line[1] == "cnf"
-            k, n = int(line[2]), int(line[3])
-            break
+def report_progress(stats):
+    log.info("progress : " + ", ".join(f"{name} {stats[name]}" for name in STATS))
 
-    Formula = []
-    for i in range(n):
-        line = sys.stdin.readline().split(" ")
-
-        # increasing order (by abs)
-        indexes = line[:-1]
-        assert line[-1] == '0\n'
-        indexes.sort(key = lambda x : abs(int(x)))
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="solve a cnf file")
+    parser.add_argument('path', nargs='?', default='-', help="cnf file, stdin by default")
+    parser.add_argument('-p', '--proof', help="write a drat proof of unsatisfiability to this file")
+    parser.add_argument('--binary-proof', action='store_true', help="write the proof in the binary drat format")
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help="trace the search : -v for restarts and reductions, "
+                             "-vv for every conflict, -vvv for every assignment")
+    parser.add_argument('--conflicts', type=int, help="give up after this many conflicts")
+    parser.add_argument('--propagations', type=int, help="give up after this many propagations")
+    parser.add_argument('-t', '--time', type=float, help="give up after this many seconds of solving")
+    parser.add_argument('--memory', type=float, help="give up once the process uses this many megabytes")
+    parser.add_argument('--progress', action='store_true',
+                        help=f"print the statistics every {PROGRESS_PERIOD} s of search")
+    parser.add_argument('--cache', help="sqlite file of the answers of earlier solves, reused for the same formula")
+    parser.add_argument('--cache-rename', action='store_true',
+                        help="reuse the answers of formulas which only differ by the names of their variables")
+    args = parser.parse_args()
+    # the trace is printed as dimacs comment lines
+    levels = [logging.WARNING, logging.INFO, logging.DEBUG, TRACE]
+    logging.basicConfig(stream=sys.stdout, format="c %(message)s",
+                        level=levels[min(args.verbose, len(levels) - 1)])
 
-        clause = Clause()
-        for j in indexes:
-            clause.addLiteral(
-                Literal(abs(int(j))-1, True if j[0] == '-' else False))
-        Formula.append(clause)
+    # the cnf is read from the file given as an argument, or from stdin
+    start = time.time()
+    Formula, n, k = read_dimacs(args.path)
+    stats = {'time_parse': time.time() - start}
 
+    memory = int(args.memory * 1024 * 1024) if args.memory is not None else None
+    budget = Budget(args.conflicts, args.propagations, args.time, memory)
+    # ctrl-c gives up with the statistics so far
+    signal.signal(signal.SIGINT, lambda signum, frame: budget.interrupt())
+    progress = None
+    if args.progress:
+        progress = report_progress
+        log.setLevel(min(log.getEffectiveLevel(), logging.INFO))
 
-    solve_result = solve(Formula, n, k)
+    proof = DratWriter(args.proof, args.binary_proof) if args.proof else None
+    cache = ResultCache(path=args.cache, rename=args.cache_rename) if args.cache else None
+    try:
+        if cache is not None:
+            solve_result = cached_solve(Formula, n, k, cache, stats, proof, budget, progress)
+        else:
+            solve_result = solve(Formula, n, k, stats, proof, budget, progress)
+    finally:
+        if proof is not None:
+            proof.close()
+        if cache is not None:
+            cache.close()
     solution = solve_result[0]
-    #assert solve_result[1] == True
+    if solve_result[1]:
+        # the model is checked against the input clauses, which solve leaves as they are
+        verify_start = time.time()
+        falsified = verify(Formula, k, solution)
+        stats['time_verify'] = time.time() - verify_start
+        if falsified:
+            print(f"c error : the model falsifies {len(falsified)} clauses", file=sys.stderr)
+            print("s UNKNOWN")
+            sys.exit(1)
+    stats['time_total'] = time.time() - start
+    print_stats(stats)
 
+    if solve_result[1] is None:
+        print("s UNKNOWN")
+        sys.exit(0)
     s = "SATISFIABLE" if solve_result[1] else "UNSATISFIABLE"
     print(f"s {s}")
     if s == "SATISFIABLE":
-        print("v ", end='')
-        ret = ""
-        for assignment in solution.values():
-            if assignment.value == False:
-                ret += str(assignment.ind+1) + " "
-        print(f"{ret}0")
-    sys.exit(0)
\ No newline at end of file
+        print(format_model(solution, k))
+    sys.exit(0)
@@ -0,0 +1,34 @@
+import time
+
+# seconds between two checks of the budget while waiting for the workers
+WORKER_POLL = 0.1
+
+def deadline(budget):
+    """
+    :param budget: Budget of the workers
+    :return: time.time() at which the waiting for them gives up, None for never
+    """
+    return time.time() + budget.time if budget.time is not None else None
+
+def wait(get, empty, budget, deadline, alive = None):
+    """
+    wait for the next result of worker processes. the main process waits in short steps,
+    to see the interruptions and the deadline of the budget.
+    the workers left are cancelled by the caller, by terminating its processes or leaving its pool.
+    :param get: called with a timeout in seconds, returns the next result or raises empty
+    :param empty: exception raised by get when no result came in time
+    :param budget: Budget of the workers
+    :param deadline: time.time() after which it gives up, None for never
+    :param alive: called before every step, false once every worker stopped, if given
+    :return: the result, None if the budget ran out
+    """
+    while True:
+        if budget.interrupted or (deadline is not None and time.time() >= deadline):
+            return None
+        # checked before the step, so that a result sent just before its worker stopped is still read
+        running = alive is None or alive()
+        try:
+            return get(timeout=WORKER_POLL)
+        except empty:
+            if not running:
+                raise RuntimeError("every worker stopped without an answer")
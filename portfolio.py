@@ -0,0 +1,171 @@
+import logging
+import multiprocessing
+import os
+import queue
+
+import solver
+import parallel
+from solver import ClauseDB, Assignment, TYPE_DECISION
+
+# (decision mode, restart policy) of every worker.
+# with more workers than configurations, they are run again with other seeds
+PORTFOLIO = [
+    (solver.DECISION_VSIDS, solver.RESTART_LUBY),
+    (solver.DECISION_VSIDS, solver.RESTART_GLUCOSE),
+    (solver.DECISION_LOCAL, solver.RESTART_NONE),
+    (solver.DECISION_RESTART, solver.RESTART_LUBY),
+    (solver.DECISION_NAIVE, solver.RESTART_GLUCOSE),
+    (solver.DECISION_GREEDY_APPEARANCE, solver.RESTART_LUBY),
+    (solver.DECISION_NAIVE, solver.RESTART_LUBY),
+]
+# one worker per core
+PORTFOLIO_WORKERS = os.cpu_count() or 1
+# learned clauses up to this size are shared between workers, 0 to share none
+SHARE_MAX_SIZE = 2
+# integers in the shared buffer of every worker
+SHARE_BUFFER = 1 << 16
+
+log = logging.getLogger('solver.portfolio')
+
+class ClauseExchange:
+    """
+    short learned clauses shared between workers through shared memory.
+    every worker writes to its own ring buffer as [size, lits...] records,
+    and publishes the total it has written, so no lock is needed.
+    a reader lapped by a writer skips what was overwritten.
+    """
+    def __init__(self, buffers, written, me):
+        self.buffers = buffers
+        self.written = written
+        self.me = me
+        # position read so far in the buffer of every worker
+        self.read = [0] * len(written)
+
+    @staticmethod
+    def create(workers, ctx = multiprocessing):
+        # shared arrays for workers ClauseExchanges
+        return ctx.RawArray('i', workers * SHARE_BUFFER), ctx.RawArray('q', workers)
+
+    def export(self, lits):
+        if len(lits) > SHARE_MAX_SIZE:
+            return
+        base = self.me * SHARE_BUFFER
+        pos = self.written[self.me]
+        for x in [len(lits)] + list(lits):
+            self.buffers[base + pos % SHARE_BUFFER] = x
+            pos += 1
+        self.written[self.me] = pos
+
+    def receive(self):
+        """
+        :return: list of the clauses written by the other workers since the last call
+        """
+        clauses = []
+        for w in range(len(self.written)):
+            if w == self.me:
+                continue
+            end = self.written[w]
+            start = pos = self.read[w]
+            self.read[w] = end
+            if end - start > SHARE_BUFFER:
+                continue
+            base = w * SHARE_BUFFER
+            got = []
+            while pos < end:
+                size = self.buffers[base + pos % SHARE_BUFFER]
+                got.append([self.buffers[base + (pos + 1 + i) % SHARE_BUFFER] for i in range(size)])
+                pos += 1 + size
+            # the records are only valid if the writer did not lap them while reading
+            if self.written[w] - start > SHARE_BUFFER:
+                continue
+            clauses.extend(got)
+        return clauses
+
+def _work(index, worker_config, seed, db, n, k, shared, results, budget, config):
+    mode, policy = worker_config
+    config.decision_mode = mode
+    config.restart_policy = policy
+    config.seed = seed
+    exchange = ClauseExchange(*shared, index) if SHARE_MAX_SIZE > 0 else None
+    # the workers do not trace, only the answer is reported
+    solver.log.setLevel(logging.WARNING)
+    stats = {}
+    if mode == solver.DECISION_LOCAL:
+        if budget.time is None and (budget.conflicts is not None or budget.propagations is not None):
+            # flips are neither conflicts nor propagations, so such a budget would never stop local search
+            results.put((index, {}, None, stats))
+            return
+        # local search only answers if satisfiable, the other workers have to refute
+        from localsearch import LocalSearch, model
+        local = LocalSearch(db, k, config.newRandom())
+        values = local.walk(budget=budget)
+        if values is None:
+            # an empty clause, or the budget ran out
+            results.put((index, {}, None, stats))
+            return
+        A, is_sat = model(values), True
+        stats.update(flips=local.flips, tries=local.tries)
+    else:
+        A, is_sat = solver.search(db, n, k, exchange, stats, budget=budget, config=config)
+    results.put((index, {ind: a.value for ind, a in A.items()}, is_sat, stats))
+
+def solve_portfolio(db : ClauseDB, n, k, workers = None, stats = None, budget = None, config = None):
+    """
+    run the configurations of PORTFOLIO in a process pool, until one of them is done.
+    :param db: clauses
+    :param n: num of clauses
+    :param k: num of variables
+    :param workers: num of processes, PORTFOLIO_WORKERS by default
+    :param stats: dict filled with the counters of the worker which answered, if given
+    :param budget: Budget of every worker, if given. the portfolio gives up once every worker did,
+    or once it is interrupted or out of time
+    :param config: Config the workers start from, with their decision mode, restart policy and seed
+    :return: (Assignments(if satisfiable), isSat (true / false / None if the budget ran out)
+    """
+    workers = workers or PORTFOLIO_WORKERS
+    budget = budget or solver.Budget()
+    config = solver.Config() if config is None else config
+    deadline = parallel.deadline(budget)
+    ctx = multiprocessing.get_context()
+    results = ctx.Queue()
+    shared = ClauseExchange.create(workers, ctx)
+    processes = []
+    for i in range(workers):
+        worker_config = PORTFOLIO[i % len(PORTFOLIO)]
+        seed = i // len(PORTFOLIO)
+        log.info(f"worker {i} : {solver.decisions[worker_config[0]]}, restart policy {worker_config[1]}, seed {seed}")
+        processes.append(ctx.Process(target=_work, args=(i, worker_config, seed, db, n, k, shared, results, budget, config),
+                                     daemon=True))
+    for p in processes:
+        p.start()
+
+    unknown = 0
+    try:
+        while True:
+            result = parallel.wait(results.get, queue.Empty, budget, deadline,
+                                   alive=lambda: any(p.is_alive() for p in processes))
+            if result is None:
+                log.info("giving up : the budget ran out")
+                return {}, None
+            index, values, is_sat, worker_stats = result
+            if is_sat is not None:
+                break
+            # a worker which gave up leaves the answer to the others
+            unknown += 1
+            if unknown == workers:
+                log.info("giving up : every worker ran out of budget")
+                if stats is not None:
+                    stats.update(worker_stats)
+                return {}, None
+    finally:
+        # the first answer wins, the other workers are cancelled
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            p.join()
+
+    log.info(f"worker {index} answered first")
+    if stats is not None:
+        stats.update(worker_stats)
+    A = {ind: Assignment(ind, value, TYPE_DECISION) for ind, value in values.items()}
+    return A, is_sat
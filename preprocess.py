@@ -0,0 +1,345 @@
+import time
+from collections import deque
+
+from solver import ClauseDB, Assignment, Config, TYPE_DECISION, memory_usage
+
+# bounded variable elimination : a variable is eliminated only if it occurs in at most
+# ELIM_OCC_LIMIT clauses, no resolvent is longer than ELIM_CLAUSE_LIMIT literals,
+# and the formula does not grow by more than ELIM_GROW clauses
+ELIM_OCC_LIMIT = 24
+ELIM_CLAUSE_LIMIT = 20
+ELIM_GROW = 0
+# clauses whose rarest literal occurs more often than this are not used to subsume others
+SUBSUME_OCC_LIMIT = 1000
+# subsumption checks and resolutions tried before the step is given up, so that
+# preprocessing a large formula stays cheap next to the search
+SUBSUME_EFFORT = 2000000
+ELIM_EFFORT = 2000000
+
+class Preprocessor:
+    """
+    simplifies the input clauses of a ClauseDB before search with
+    top level unit propagation, subsumption, self-subsuming resolution (strengthening),
+    and bounded variable elimination, of which pure literal elimination is the case
+    without resolvents.
+    clauses are sets of encoded literals, and occurs[lit] is the set of clauses holding lit.
+    with a DratWriter (see proof.py), every clause added or strengthened is added to the proof
+    before the clauses it replaces are deleted.
+    with a Budget, the simplification stops once it is interrupted, out of time or out of memory.
+    """
+    def __init__(self, db : ClauseDB, k, proof = None):
+        self.k = k
+        self.proof = proof
+        self.clauses = []
+        self.cids = []
+        # signature of the indexes of a clause, to rule out subsumption quickly
+        self.sigs = []
+        self.occurs = [set() for _ in range(2 * k)]
+        # {index : value} fixed by unit clauses
+        self.fixed = {}
+        self.units = deque()
+        # clauses added or strengthened, to be checked for subsuming others
+        self.queue = deque()
+        # indexes whose occurrences changed, to be tried for elimination
+        self.touched = set()
+        # (index, clauses removed with it) in order of elimination
+        self.elim_stack = []
+        self.eliminated = bytearray(k)
+        self.unsat = False
+        self.num_subsumed = 0
+        self.num_strengthened = 0
+        self.subsume_effort = 0
+        self.elim_effort = 0
+        self.budget = None
+        self.deadline = float('inf')
+        # steps between two checks of the time and memory of the budget, from the Config of run
+        self.budget_check = self.ticks = 1
+        # the limit of the budget which stopped the simplification, if any
+        self.stopped = None
+
+        for cref in range(len(db)):
+            if not db.learnt[cref]:
+                self.addClause(db.literalsOf(cref), db.cid[cref])
+
+    def value(self, lit):
+        # True / False if the index of lit is fixed, None otherwise
+        value = self.fixed.get(lit >> 1)
+        return None if value is None else value != (lit & 1)
+
+    def assign(self, lit):
+        value = self.value(lit)
+        if value is None:
+            self.fixed[lit >> 1] = not (lit & 1)
+            self.units.append(lit)
+        elif not value:
+            self.unsat = True
+
+    def addClause(self, lits, cid = -1):
+        # a clause without a cid is derived, the other ones are input clauses
+        clause = set(lits)
+        proof = self.proof
+        if self.fixed:
+            for lit in list(clause):
+                value = self.value(lit)
+                if value:
+                    if proof is not None and cid != -1:
+                        proof.delete(lits)
+                    return
+                if value is not None:
+                    clause.discard(lit)
+        inds = {lit >> 1 for lit in clause}
+        if len(inds) < len(clause):
+            # tautology
+            return
+        if proof is not None and (cid == -1 or len(clause) < len(lits)):
+            proof.add(clause)
+            if cid != -1:
+                proof.delete(lits)
+        if len(clause) <= 1:
+            if clause:
+                self.assign(clause.pop())
+            else:
+                self.unsat = True
+            return
+
+        c = len(self.clauses)
+        self.clauses.append(clause)
+        self.cids.append(cid)
+        self.sigs.append(signature(clause))
+        for lit in clause:
+            self.occurs[lit].add(c)
+        self.touched |= inds
+        self.queue.append(c)
+
+    def removeClause(self, c, delete = True):
+        if delete and self.proof is not None:
+            self.proof.delete(self.clauses[c])
+        for lit in self.clauses[c]:
+            self.occurs[lit].discard(c)
+            self.touched.add(lit >> 1)
+        self.clauses[c] = None
+
+    def strengthen(self, c, lit):
+        # remove lit from the clause c
+        clause = self.clauses[c]
+        if self.proof is not None:
+            self.proof.add(clause - {lit})
+            self.proof.delete(clause)
+        clause.discard(lit)
+        self.occurs[lit].discard(c)
+        self.touched.add(lit >> 1)
+        if len(clause) == 1:
+            self.assign(next(iter(clause)))
+            # the unit clause stays in the proof
+            self.removeClause(c, delete=False)
+            return
+        self.sigs[c] = signature(clause)
+        self.queue.append(c)
+
+    def propagateUnits(self):
+        while self.units and not self.unsat:
+            lit = self.units.popleft()
+            for c in list(self.occurs[lit]):
+                self.removeClause(c)
+            for c in list(self.occurs[lit ^ 1]):
+                self.strengthen(c, lit ^ 1)
+
+    def subsume(self, c):
+        # remove the clauses subsumed by c, and strengthen the ones c resolves with
+        clause = self.clauses[c]
+        occurs = self.occurs
+        best = min(clause, key=lambda l: len(occurs[l]) + len(occurs[l ^ 1]))
+        if len(occurs[best]) + len(occurs[best ^ 1]) > SUBSUME_OCC_LIMIT:
+            return
+        sig = self.sigs[c]
+        candidates = list(occurs[best]) + list(occurs[best ^ 1])
+        self.subsume_effort += len(candidates)
+        for d in candidates:
+            other = self.clauses[d]
+            if d == c or other is None or len(other) < len(clause) or sig & ~self.sigs[d]:
+                continue
+            flipped = None
+            for lit in clause:
+                if lit in other:
+                    continue
+                if flipped is None and lit ^ 1 in other:
+                    flipped = lit ^ 1
+                    continue
+                break
+            else:
+                if flipped is None:
+                    self.removeClause(d)
+                    self.num_subsumed += 1
+                else:
+                    self.strengthen(d, flipped)
+                    self.num_strengthened += 1
+
+    def outOfBudget(self):
+        # the interruption is checked at every step, the time and memory every budget_check steps
+        budget = self.budget
+        if budget is None or self.stopped is not None:
+            return self.stopped is not None
+        if budget.interrupted:
+            self.stopped = 'interrupted'
+            return True
+        self.ticks -= 1
+        if self.ticks:
+            return False
+        self.ticks = self.budget_check
+        if time.time() >= self.deadline:
+            self.stopped = f"{budget.time:.3f} s"
+            return True
+        if budget.memory is not None:
+            memory = memory_usage()
+            if memory is not None and memory >= budget.memory:
+                self.stopped = f"{memory} bytes of memory"
+                return True
+        return False
+
+    def simplify(self):
+        # unit propagation and subsumption to a fixpoint
+        while not self.unsat and (self.units or self.queue):
+            if self.outOfBudget():
+                return
+            self.propagateUnits()
+            if self.subsume_effort > SUBSUME_EFFORT:
+                self.queue.clear()
+            if self.queue:
+                c = self.queue.popleft()
+                if self.clauses[c] is not None:
+                    self.subsume(c)
+
+    def eliminate(self, ind):
+        """
+        replace the clauses of ind by their non tautological resolvents on ind.
+        :return: whether ind was eliminated
+        """
+        pos, neg = self.occurs[2 * ind], self.occurs[2 * ind + 1]
+        if pos and neg and len(pos) + len(neg) > ELIM_OCC_LIMIT:
+            return False
+        self.elim_effort += len(pos) * len(neg)
+        resolvents = []
+        for p in pos:
+            clause = self.clauses[p]
+            for q in neg:
+                other = self.clauses[q]
+                if any(lit ^ 1 in other for lit in clause if lit >> 1 != ind):
+                    continue
+                resolvent = (clause | other) - {2 * ind, 2 * ind + 1}
+                if len(resolvent) > ELIM_CLAUSE_LIMIT \
+                        or len(resolvents) >= len(pos) + len(neg) + ELIM_GROW:
+                    return False
+                resolvents.append(resolvent)
+
+        # the clauses of ind are kept to extend the model afterwards
+        removed = list(pos | neg)
+        self.elim_stack.append((ind, [list(self.clauses[c]) for c in removed]))
+        self.eliminated[ind] = 1
+        # the resolvents are added first, to be implied by the clauses in the proof
+        for resolvent in resolvents:
+            self.addClause(resolvent)
+        for c in removed:
+            self.removeClause(c)
+        return True
+
+    def run(self, budget = None, config = None):
+        """
+        :param budget: Budget of the simplification, if given. its interruption, time and memory are checked
+        :param config: Config whose budget_check the budget is checked by, the module settings by default
+        :return: False if the formula was found unsatisfiable, True otherwise
+        (see stopped for whether the budget ran out first)
+        """
+        self.budget = budget
+        self.budget_check = self.ticks = (Config() if config is None else config).budget_check
+        if budget is not None and budget.time is not None:
+            self.deadline = time.time() + budget.time
+        self.simplify()
+        while self.touched and not self.unsat and self.stopped is None:
+            occurs = self.occurs
+            # cheapest candidates first, pure literals before the others
+            candidates = sorted(self.touched, key=lambda ind: len(occurs[2 * ind]) * len(occurs[2 * ind + 1]))
+            self.touched = set()
+            for ind in candidates:
+                if self.elim_effort > ELIM_EFFORT or self.outOfBudget():
+                    return not self.unsat
+                if self.eliminated[ind] or ind in self.fixed \
+                        or not (occurs[2 * ind] or occurs[2 * ind + 1]):
+                    continue
+                if self.eliminate(ind):
+                    self.simplify()
+                    if self.unsat:
+                        break
+        return not self.unsat
+
+    def clauseDB(self):
+        """
+        :return: ClauseDB with the remaining clauses, and a unit clause for every fixed index
+        """
+        db = ClauseDB()
+        resolvents = []
+        for clause, cid in zip(self.clauses, self.cids):
+            if clause is None:
+                continue
+            if cid == -1:
+                resolvents.append(clause)
+            else:
+                db.add(clause, cid)
+        # new clauses get cids above the input ones
+        for clause in resolvents:
+            db.add(clause)
+        for ind, value in self.fixed.items():
+            db.add([2 * ind + int(not value)])
+        return db
+
+    def extendModel(self, A : dict[Assignment]):
+        """
+        give values to the eliminated indexes so that their removed clauses are satisfied,
+        in reverse order of elimination.
+        indexes of removed clauses missing from A are set to false first.
+        """
+        for ind, removed in self.elim_stack:
+            for lits in removed:
+                for lit in lits:
+                    if lit >> 1 not in A:
+                        A[lit >> 1] = Assignment(lit >> 1, False, TYPE_DECISION)
+
+        for ind, removed in reversed(self.elim_stack):
+            value = False
+            for lits in removed:
+                if 2 * ind in lits and not any(A[lit >> 1].value != (lit & 1)
+                                               for lit in lits if lit >> 1 != ind):
+                    value = True
+                    break
+            A[ind].value = value
+        return A
+
+    def __str__(self):
+        clauses = sum(clause is not None for clause in self.clauses) + len(self.fixed)
+        return f"{clauses} clauses left, {len(self.elim_stack)} variables eliminated, " \
+               f"{len(self.fixed)} fixed, {self.num_subsumed} clauses subsumed, " \
+               f"{self.num_strengthened} strengthened"
+
+def signature(clause):
+    sig = 0
+    for lit in clause:
+        sig |= 1 << ((lit >> 1) & 63)
+    return sig
+
+def preprocess(db : ClauseDB, k, proof = None, budget = None, config = None):
+    """
+    :param db: clauses to simplify, not modified
+    :param k: num of variables
+    :param proof: DratWriter the simplification steps are written to, if given
+    :param budget: Budget of the simplification, if given
+    :param config: Config of the solve, for its budget_check
+    :return: (simplified ClauseDB, or None if unsatisfiable, Preprocessor to extend the model with).
+    the ClauseDB is db itself if the budget ran out first, with the Preprocessor stopped
+    """
+    preprocessor = Preprocessor(db, k, proof)
+    if not preprocessor.run(budget, config):
+        if proof is not None:
+            proof.add([])
+        return None, preprocessor
+    if preprocessor.stopped is not None:
+        return db, preprocessor
+    return preprocessor.clauseDB(), preprocessor
@@ -0,0 +1,74 @@
+import sys
+
+# bytes of proof kept in memory before they are written to the file
+PROOF_BUFFER = 1 << 20
+
+class DratWriter:
+    """
+    streams a DRAT proof of unsatisfiability : the clauses derived by the solver are added,
+    and the ones it drops are deleted, in the order it does so.
+    the last clause of a complete proof is the empty clause.
+    clauses are given as encoded literals (see Literal.encode), and written
+    in the text format (dimacs literals, with 'd' before a deletion) or the binary one
+    ('a' / 'd' followed by the literals 2 * v or 2 * v + 1 for v / -v as variable-length integers).
+    """
+    def __init__(self, file, binary = False):
+        """
+        :param file: path, '-' for stdout, or a binary file object
+        :param binary: whether to write the binary format
+        """
+        # only a file opened here is closed with the writer
+        self.own = False
+        if file == '-':
+            file = sys.stdout.buffer
+        elif not hasattr(file, 'write'):
+            file = open(file, 'wb')
+            self.own = True
+        self.file = file
+        self.binary = binary
+        self.buffer = bytearray()
+        self.added = 0
+        self.deleted = 0
+
+    def add(self, lits):
+        self.added += 1
+        self._write(b'a', b'', lits)
+
+    def delete(self, lits):
+        self.deleted += 1
+        self._write(b'd', b'd ', lits)
+
+    def _write(self, tag, prefix, lits):
+        buffer = self.buffer
+        if self.binary:
+            buffer += tag
+            for lit in lits:
+                # 2 * v + sign, with v counted from 1
+                u = lit + 2
+                while u > 127:
+                    buffer.append(u & 127 | 128)
+                    u >>= 7
+                buffer.append(u)
+            buffer.append(0)
+        else:
+            buffer += prefix
+            buffer += b''.join(b'%d ' % (-(lit >> 1) - 1 if lit & 1 else (lit >> 1) + 1) for lit in lits)
+            buffer += b'0\n'
+        if len(buffer) >= PROOF_BUFFER:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.own:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
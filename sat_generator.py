@@ -1,42 +1,161 @@
-import random
+import argparse
+import sys
+
 import numpy as np
 
-def generate_sat_input(num_variables, num_clauses):
-    # Generate comments
-    comments = [f"c This is a random SAT instance with {num_variables} variables and {num_clauses} clauses"]
+# clauses sampled and written at a time
+CHUNK_CLAUSES = 1 << 16
+# clause / variable ratios of the satisfiability threshold of uniform random k-sat
+THRESHOLDS = {2: 1.0, 3: 4.267, 4: 9.931, 5: 21.117, 6: 43.37, 7: 87.79}
+
+def _distinct_rows(rows, sample):
+    # resample the rows of rows (2d array of variables) which repeat a variable,
+    # with sample(num of rows) giving new rows
+    while True:
+        ordered = np.sort(rows, axis=1)
+        repeated = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+        if len(repeated) == 0:
+            return rows
+        rows[repeated] = sample(len(repeated))
+
+def _signs(rng, rows, k):
+    return np.where(rng.random((rows, k)) < 0.5, -1, 1)
 
-    # Generate the header line
-    header = f"p cnf {num_variables} {num_clauses}"
+def uniform_ksat(rng, num_variables, num_clauses, k = 3):
+    """
+    uniform random k-sat : every clause has k distinct variables, chosen uniformly, with random signs.
+    :param rng: numpy Generator
+    :return: iterator of (rows, k) arrays of dimacs literals, CHUNK_CLAUSES rows at most
+    """
+    if num_variables < k:
+        raise ValueError(f"{num_variables} variables are not enough for clauses of {k} literals")
+    sample = lambda rows: rng.integers(1, num_variables + 1, (rows, k))
+    for done in range(0, num_clauses, CHUNK_CLAUSES):
+        rows = min(CHUNK_CLAUSES, num_clauses - done)
+        yield _distinct_rows(sample(rows), sample) * _signs(rng, rows, k)
 
-    # Generate clauses
-    clauses = []
-    for _ in range(num_clauses):
-        clause = []
+def planted_ksat(rng, num_variables, num_clauses, k = 3, solution = None):
+    """
+    uniform random k-sat restricted to the clauses satisfied by a hidden solution,
+    so that the formula is satisfiable at any ratio.
+    :param solution: bool array of the values of the variables 1..num_variables, random by default
+    :return: (solution, iterator of chunks as in uniform_ksat)
+    """
+    if solution is None:
+        solution = rng.random(num_variables) < 0.5
+    # value of the literal v is truth[v]
+    truth = np.concatenate((~solution[::-1], [False], solution))
+    def chunks():
+        for clauses in uniform_ksat(rng, num_variables, num_clauses, k):
+            while True:
+                falsified = np.flatnonzero(~truth[clauses + num_variables].any(axis=1))
+                if len(falsified) == 0:
+                    break
+                clauses[falsified] = next(uniform_ksat(rng, num_variables, len(falsified), k))
+            yield clauses
+    return solution, chunks()
 
-        num_lit_clause = random.randint(2, num_variables//2 + 1)
-        indices = [i for i in range(num_lit_clause)]
-        literals = random.sample(range(1, num_variables + 1), num_lit_clause)
-        literals = np.array([lit for lit in literals])
-        signs = np.random.choice([-1, 1], size=num_lit_clause, p=[0.5, 0.5])
-        clause.extend(literals * signs)
-        clause.append(0)
-        clauses.append(" ".join(map(str, clause)))
+def community_ksat(rng, num_variables, num_clauses, k = 3, communities = 40, modularity = 0.8):
+    """
+    community structured k-sat (Giraldez-Cru and Levy) : the variables are split into communities
+    of consecutive variables, and a clause takes its variables in a single community
+    with probability modularity, and in k distinct communities otherwise.
+    the num_variables % communities last variables are left out.
+    :return: iterator of chunks as in uniform_ksat
+    """
+    size = num_variables // communities
+    if size < k or communities < k:
+        raise ValueError(f"{communities} communities of {num_variables} variables "
+                         f"do not fit clauses of {k} literals")
+    sample_communities = lambda rows: rng.integers(0, communities, (rows, k))
+    def sample(rows):
+        inner = rng.random(rows) < modularity
+        community = sample_communities(rows)
+        community[inner] = community[inner, :1]
+        outer = np.flatnonzero(~inner)
+        community[outer] = _distinct_rows(community[outer], sample_communities)
+        return community * size + rng.integers(1, size + 1, (rows, k))
+    for done in range(0, num_clauses, CHUNK_CLAUSES):
+        rows = min(CHUNK_CLAUSES, num_clauses - done)
+        yield _distinct_rows(sample(rows), sample) * _signs(rng, rows, k)
 
-    # Combine comments, header, and clauses
-    sat_input = "\n".join(comments + [header] + clauses)
+def write_dimacs(file, num_variables, num_clauses, chunks, comments = ()):
+    """
+    write the clauses of chunks (arrays as in uniform_ksat) as dimacs cnf, chunk by chunk.
+    :param file: text file object
+    """
+    for comment in comments:
+        file.write(f"c {comment}\n")
+    file.write(f"p cnf {num_variables} {num_clauses}\n")
+    for clauses in chunks:
+        line = "%d " * clauses.shape[1] + "0\n"
+        file.write((line * len(clauses)) % tuple(clauses.ravel().tolist()))
 
-    return sat_input
+def generate_sat_input(num_variables, num_clauses, seed = None):
+    """
+    the original instances of sat_inputs : every clause has 2 to num_variables // 2 + 1
+    distinct variables, with random signs.
+    :return: dimacs text
+    """
+    rng = np.random.default_rng(seed)
+    widths = rng.integers(2, num_variables // 2 + 2, num_clauses)
+    # the first width variables of a random permutation per clause
+    variables = np.argsort(rng.random((num_clauses, num_variables)), axis=1) + 1
+    literals = variables * _signs(rng, num_clauses, num_variables)
+    lines = [f"c This is a random SAT instance with {num_variables} variables and {num_clauses} clauses",
+             f"p cnf {num_variables} {num_clauses}"]
+    for width, clause in zip(widths.tolist(), literals.tolist()):
+        lines.append(" ".join(map(str, clause[:width])) + " 0")
+    return "\n".join(lines)
 
 def save_sat_input(sat_input, filename):
     with open(filename, "w") as file:
         file.write(sat_input)
 
-# Example usage
-num_variables = 10
-num_clauses = 200
-directory = './sat_inputs_small/'
-for i in range(10):
-    filename = f"input_{num_variables}vars_{num_clauses}clauses_{i}.cnf"
-    sat_input = generate_sat_input(num_variables, num_clauses)
-    save_sat_input(sat_input, directory + filename)
-    print(f"SAT input saved to {filename}")
\ No newline at end of file
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="generate random cnf instances")
+    parser.add_argument('kind', choices=['uniform', 'planted', 'community'])
+    parser.add_argument('-n', '--variables', type=int, required=True)
+    clauses = parser.add_mutually_exclusive_group()
+    clauses.add_argument('-m', '--clauses', type=int, help="num of clauses")
+    clauses.add_argument('-r', '--ratio', type=float,
+                         help="clauses per variable (default : the satisfiability threshold of k)")
+    parser.add_argument('-k', type=int, default=3, help="literals per clause (default : 3)")
+    parser.add_argument('-s', '--seed', type=int, help="seed, for the same instance every time")
+    parser.add_argument('-c', '--communities', type=int, default=40)
+    parser.add_argument('-q', '--modularity', type=float, default=0.8)
+    parser.add_argument('-o', '--output', default='-', help="output file, '-' for stdout")
+    parser.add_argument('--solution', help="file to write the planted solution to, as a dimacs v line")
+    args = parser.parse_args(argv)
+
+    n, k = args.variables, args.k
+    if args.clauses is not None:
+        m = args.clauses
+    else:
+        ratio = args.ratio if args.ratio is not None else THRESHOLDS.get(k)
+        if ratio is None:
+            parser.error(f"no known threshold for k = {k}, give --clauses or --ratio")
+        m = round(ratio * n)
+    rng = np.random.default_rng(args.seed)
+    comments = [f"{args.kind} random {k}-sat with {n} variables and {m} clauses, seed {args.seed}"]
+    if args.kind == 'uniform':
+        chunks = uniform_ksat(rng, n, m, k)
+    elif args.kind == 'planted':
+        solution, chunks = planted_ksat(rng, n, m, k)
+        if args.solution:
+            with open(args.solution, 'w') as file:
+                values = np.arange(1, n + 1) * np.where(solution, 1, -1)
+                file.write("v " + " ".join(map(str, values.tolist())) + " 0\n")
+    else:
+        chunks = community_ksat(rng, n, m, k, args.communities, args.modularity)
+        comments.append(f"{args.communities} communities, modularity {args.modularity}")
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        write_dimacs(out, n, m, chunks, comments)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,98 @@
-import copy
+import logging
+import os
 import random
-import threading
+import sys
+from array import array
+from collections import deque
+from itertools import accumulate
 import time
 
 TYPE_DECISION = 0
 TYPE_IMPLIED = 1
-print_clause = False
-print_assign = False
 DECISION_NAIVE = 0
 DECISION_MULTITHREAD = 5
 DECISION_GREEDY_APPEARANCE = 1
 DECISION_GREEDY_SIZE = 2
 DECISION_DFS = 3
 DECISION_RESTART = 4
+DECISION_VSIDS = 6
+DECISION_CUBE = 7
+DECISION_LOCAL = 8
 
 DECISION_MODE = 4
 
-num_of_clauses = -1
+RESTART_NONE = 0
+RESTART_LUBY = 1
+RESTART_GLUCOSE = 2
+
+# None for RESTART_LUBY in the vsids mode and RESTART_NONE in the others, so that the legacy modes
+# search as they did before the restart policies. an explicit policy applies to every mode but dfs
+RESTART_POLICY = None
+
+# learned clause database reduction : conflicts before the first reduction,
+# growth of the interval after each one, and the ceilings that force a reduction
+REDUCE_FIRST = 2000
+REDUCE_INC = 300
+MAX_LEARNTS = 100000
+MAX_LEARNT_MEMORY = 64 * 1024 * 1024
+
+# simplify the input clauses before search (see preprocess.py)
+PREPROCESS = True
+
+# formulas with at most this many variables are solved by the bit mask dpll of bitsolver.py,
+# unless a proof is asked for, or the decision mode is given to the Config of the solve. 0 to never
+SMALL_FORMULA_VARS = 64
+
+# vsids decides the value a variable had when it was last unassigned (phase saving),
+# or with TARGET_PHASE, the value it had in the longest trail without conflict since the last restart,
+# if it is in that trail (the target). target phases are off until rephasing is on, as they tend to keep
+# the search in the same part of the space without it.
+# every REPHASE_INTERVAL conflicts (growing by as much after each time), the saved phases are reset
+# to the next kind of REPHASES, 'best' being the longest trail since the last rephase. 0 to never rephase
+PHASE_SAVING = True
+TARGET_PHASE = False
+REPHASE_INTERVAL = 0
+REPHASES = ['best', 'original', 'best', 'inverted', 'best', 'random']
+# at a restart of vsids, the decision levels that would be decided again in the same order are kept
+TRAIL_REUSE = True
+# value of a variable outside the target or the best trail
+NO_PHASE = 2
+
+# counters of the search in the stats dict of Solver, next to the time of every phase
+# ('time_parse', 'time_preprocess', 'time_search', in seconds)
+STATS = ['conflicts', 'decisions', 'propagations', 'restarts',
+         'learned_clauses', 'learned_literals', 'reductions']
+
+# the time, memory and propagation budgets of a solve (see Budget) are checked
+# every BUDGET_CHECK iterations of the search loop, the interruptions and conflicts at every one
+BUDGET_CHECK = 256
+# seconds between two calls of the progress callback of a solve
+PROGRESS_PERIOD = 1.0
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# the search reports through this logger : rare events (restarts, reductions, results) at INFO,
+# every conflict and decision at DEBUG, and every assignment and the clause lists at TRACE.
+# the messages of a disabled level are never built
+log = logging.getLogger('solver')
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
 
 decisions = {
     0: 'naive' ,
     1: 'greedy_appearance' ,
     2: 'greedy_size',
     3: 'dfs' ,
-    4: 'restart'
+    4: 'restart',
+    5: 'portfolio',
+    6: 'vsids',
+    7: 'cube',
+    8: 'local'
 }
 
 class Literal:
+    __slots__ = ('ind', 'isNegation')
+
     def __init__(self, ind, isNegation):
         self.ind = ind
         self.isNegation = isNegation
@@ -36,14 +102,124 @@ class Literal:
 
     def __cmp__(self, other):
         return self.ind >= other.ind
+
+    # literals are stored as integers 2 * ind + isNegation,
+    # so lit >> 1 is the index and lit ^ 1 is the complementary literal
+    def encode(self):
+        return 2 * self.ind + int(self.isNegation)
+
+    @staticmethod
+    def decode(lit):
+        return Literal(lit >> 1, bool(lit & 1))
+
+class Budget:
+    """
+    limits of a solve, after which it gives up with an unknown answer (isSat None).
+    every limit is None for none : conflicts and propagations of the search,
+    seconds of wall time and bytes of resident memory of the process.
+    interrupt() makes the solve give up as well. it only sets flags,
+    so it can be called from another thread or from a signal handler.
+    """
+    def __init__(self, conflicts = None, propagations = None, time = None, memory = None):
+        self.conflicts = conflicts
+        self.propagations = propagations
+        self.time = time
+        self.memory = memory
+        self.interrupted = False
+        # budgets made by after, which are interrupted along with this one
+        self.parts = []
+
+    def interrupt(self):
+        self.interrupted = True
+        for part in self.parts:
+            part.interrupt()
+
+    def after(self, elapsed):
+        """
+        :param elapsed: seconds already spent
+        :return: Budget of what is left of the time of this one, with the same other limits
+        """
+        if self.time is None:
+            return self
+        part = Budget(self.conflicts, self.propagations, max(0.0, self.time - elapsed), self.memory)
+        self.parts.append(part)
+        part.interrupted = self.interrupted
+        return part
+
+    def __str__(self):
+        limits = [f"{name} {getattr(self, name)}" for name in ('conflicts', 'propagations', 'time', 'memory')
+                  if getattr(self, name) is not None]
+        return ", ".join(limits) or "no limit"
+
+class Config:
+    """
+    settings of a solve, owned by it : the module settings of the same names in upper case
+    (DECISION_MODE, RESTART_POLICY, ...) are only the defaults, read when the Config is made,
+    so that solves with other settings can run at the same time.
+    the random decisions of the solve are drawn from its own generator (see newRandom).
+    """
+    NAMES = ['DECISION_MODE', 'RESTART_POLICY', 'REDUCE_FIRST', 'REDUCE_INC', 'MAX_LEARNTS', 'MAX_LEARNT_MEMORY',
+             'PREPROCESS', 'SMALL_FORMULA_VARS', 'PHASE_SAVING', 'TARGET_PHASE', 'REPHASE_INTERVAL', 'REPHASES',
+             'TRAIL_REUSE', 'BUDGET_CHECK', 'PROGRESS_PERIOD']
+
+    def __init__(self, seed = None, **settings):
+        """
+        :param seed: seed of the random decisions, drawn from the random module by default
+        :param settings: settings by lower case name, e.g. decision_mode=DECISION_VSIDS
+        """
+        defaults = globals()
+        for name in Config.NAMES:
+            setattr(self, name.lower(), defaults[name])
+        for name, value in settings.items():
+            if name.upper() not in Config.NAMES:
+                raise ValueError(f"unknown setting {name}")
+            setattr(self, name, value)
+        if 'decision_mode' in settings and 'small_formula_vars' not in settings:
+            # a decision mode asked for is used whatever the size of the formula
+            self.small_formula_vars = 0
+        self.seed = seed
+
+    def newRandom(self):
+        # a generator of its own, so that concurrent solves do not draw from the same one
+        return random.Random(random.getrandbits(64) if self.seed is None else self.seed)
+
+def memory_usage():
+    """
+    :return: bytes of resident memory of the process, or None if unknown
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # the peak, in kilobytes on linux and bytes on macos
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def from_dimacs(v):
+    # dimacs literal v or -v of the variable v to an encoded literal
+    return 2 * v - 2 if v > 0 else -2 * v - 1
+
+def to_dimacs(lit):
+    return -((lit >> 1) + 1) if lit & 1 else (lit >> 1) + 1
+
 class Assignment:
-    def __init__(self, ind, value, assignmentType):
+    __slots__ = ('ind', 'value', 'assignmentType', 'impliedClause', 'level')
+
+    def __init__(self, ind, value, assignmentType, level = 0):
         self.ind = ind
         self.value = value
         # pi -> bi by a decision strategy is a decision assignment
         # pi -c-> bi by a unit propagation on a clause c is an implied assignment
         self.assignmentType = assignmentType
+        # cref of the implying clause c in the ClauseDB
         self.impliedClause = None
+        # decision level the assignment was made at
+        self.level = level
 
     def setImpliedClause(self, c):
         self.impliedClause = c
@@ -58,9 +234,12 @@ def printAssignments(A):
     print(ret.rstrip(","))
 
 class Clause:
+    __slots__ = ('lits', 'cid', 'parentid')
+
     def __init__(self, literals : dict[int, Literal] = None, cid = -1, parentid = -1):
-        # {index : literal} structure
-        self.literals = {} if literals is None else literals
+        # encoded literals (see Literal.encode), at most one per index
+        self.lits = array('i') if literals is None \
+            else array('i', [l.encode() for l in literals.values()])
         # used in memorial for unit propagation
         # if cid == -1, it says that this clause is not from original input
         self.cid = cid
@@ -69,59 +248,212 @@ class Clause:
         # else (if from original input), cid == parent.
         self.parentid = parentid
 
+    @property
+    def literals(self):
+        # {index : literal} structure, built on demand
+        return {lit >> 1: Literal.decode(lit) for lit in self.lits}
+
     def __str__(self):
         ret = ""
-        for l in self.literals.values():
-            pre = "~" if l.isNegation else ""
-            ret += f"{pre}{l.ind+1}, "
+        for lit in self.lits:
+            pre = "~" if lit & 1 else ""
+            ret += f"{pre}{(lit >> 1)+1}, "
         return ret.rstrip(",") + "|"
 
     def isUnitClause(self):
-        return len(self.literals.keys()) == 1
+        return len(self.lits) == 1
 
     def isEmpty(self):
-        return self.literals == {}
+        return len(self.lits) == 0
 
     def isInvolved(self, ind):
-        return ind in self.literals.keys()
+        return (2 * ind) in self.lits or (2 * ind + 1) in self.lits
 
     def getSign(self, ind):
-        if ind not in self.literals.keys():
-            return 0
-        return -1 if self.literals[ind].isNegation else 1
+        if 2 * ind in self.lits:
+            return 1
+        if 2 * ind + 1 in self.lits:
+            return -1
+        return 0
 
     def getSize(self):
-        return len(self.literals.keys())
+        return len(self.lits)
 
     def __cmp__(self, other):
         return self.getSize() >= other.getSize()
 
     def getIndexOfLiterals(self):
         # set of indexes
-        return set(self.literals.keys())
+        return {lit >> 1 for lit in self.lits}
 
     def makeAssign(self, A : dict[Assignment]):
-        ret_literals = copy.deepcopy(self.literals)
-        for i, assignment in A.items():
-            # if a variable(index i) is in clause
-            if i in self.literals.keys():
-                assert assignment.value is not None
-                if (assignment.value == False and self.literals[i].isNegation) \
-                        or (assignment.value == True and not self.literals[i].isNegation):
-                    return None, True
-                else:
-                    ret_literals.pop(i)
-                    if ret_literals == {}:
-                        # confilct if it becomes an empty clause
-                        return None, False
+        ret_lits = array('i')
+        for lit in self.lits:
+            assignment = A.get(lit >> 1)
+            if assignment is None:
+                ret_lits.append(lit)
+            elif assignment.value != (lit & 1):
+                return None, True
+        if len(ret_lits) == 0:
+            # confilct if it becomes an empty clause
+            return None, False
 
         # return remaining variables
-        return Clause(ret_literals, cid=-1, parentid=self.parentid), True
+        ret = Clause(cid=-1, parentid=self.parentid)
+        ret.lits = ret_lits
+        return ret, True
 
     def addLiteral(self, l : Literal):
-        #assert l not in self.getIndexOfLiterals() #todo
-        self.literals[l.ind] = l
-
+        # a literal with an index already in the clause replaces the old one
+        for pos, lit in enumerate(self.lits):
+            if lit >> 1 == l.ind:
+                self.lits[pos] = l.encode()
+                return
+        self.lits.append(l.encode())
+
+class ClauseDB:
+    """
+    array-backed clause storage.
+    the literals of every clause live in one flat array('i') in encoded form,
+    and a clause is referred to by its cref, an index into the offset/size headers.
+    learned clauses also carry an lbd and an activity used to reduce the database.
+    every clause has a cid, and the registry maps it to the current cref.
+    """
+    __slots__ = ('lits', 'start', 'size', 'cid', 'learnt', 'lbd', 'activity',
+                 'cla_inc', 'num_learnts', 'learnt_lits', 'registry', 'next_cid')
+
+    def __init__(self, clauses : list[Clause] = None):
+        self.lits = array('i')
+        self.start = array('i')
+        self.size = array('i')
+        self.cid = array('i')
+        self.learnt = array('b')
+        self.lbd = array('i')
+        self.activity = array('d')
+        self.cla_inc = 1.0
+        self.num_learnts = 0
+        self.learnt_lits = 0
+        # {cid : cref}
+        self.registry = {}
+        self.next_cid = 0
+        if clauses is not None:
+            for clause in clauses:
+                self.add(clause.lits, clause.cid)
+
+    def __len__(self):
+        return len(self.start)
+
+    def add(self, lits, cid = -1, learnt = False, lbd = 0):
+        # a clause without a cid gets the next free one
+        if cid == -1:
+            cid = self.next_cid
+        self.next_cid = max(self.next_cid, cid + 1)
+        cref = len(self.start)
+        self.registry[cid] = cref
+        self.start.append(len(self.lits))
+        self.size.append(len(lits))
+        self.cid.append(cid)
+        self.learnt.append(learnt)
+        self.lbd.append(lbd)
+        self.activity.append(0.0)
+        self.lits.extend(lits)
+        if learnt:
+            self.num_learnts += 1
+            self.learnt_lits += len(lits)
+        return cref
+
+    def extend(self, lits, sizes):
+        # add many input clauses at once : lits holds their literals back to back
+        cref = len(self.start)
+        cid = self.next_cid
+        n = len(sizes)
+        self.start.extend(accumulate(sizes[:-1], initial=len(self.lits)) if n else [])
+        self.size.extend(sizes)
+        self.cid.extend(range(cid, cid + n))
+        self.learnt.extend(bytes(n))
+        self.lbd.frombytes(bytes(self.lbd.itemsize * n))
+        self.activity.frombytes(bytes(self.activity.itemsize * n))
+        self.lits.extend(lits)
+        self.registry.update(zip(range(cid, cid + n), range(cref, cref + n)))
+        self.next_cid = cid + n
+
+    def crefOf(self, cid):
+        # raises KeyError if no clause has this cid (anymore)
+        return self.registry[cid]
+
+    def clauseOf(self, cid):
+        return self.clause(self.registry[cid])
+
+    def copy(self):
+        db = ClauseDB()
+        db.lits, db.start, db.size, db.cid = array('i', self.lits), array('i', self.start), \
+            array('i', self.size), array('i', self.cid)
+        db.learnt, db.lbd, db.activity = array('b', self.learnt), array('i', self.lbd), \
+            array('d', self.activity)
+        db.cla_inc, db.num_learnts, db.learnt_lits = self.cla_inc, self.num_learnts, self.learnt_lits
+        db.registry, db.next_cid = dict(self.registry), self.next_cid
+        return db
+
+    def literalsOf(self, cref):
+        s = self.start[cref]
+        return self.lits[s:s + self.size[cref]]
+
+    def clause(self, cref):
+        # a Clause view with a copy of the literals of cref
+        c = Clause(cid=self.cid[cref], parentid=self.cid[cref])
+        c.lits = self.literalsOf(cref)
+        return c
+
+    def learntMemory(self):
+        # approximate bytes held by learned clauses, literals and headers
+        return self.learnt_lits * self.lits.itemsize + self.num_learnts * 25
+
+    def bumpActivity(self, cref):
+        activity = self.activity
+        activity[cref] += self.cla_inc
+        if activity[cref] > 1e20:
+            for i in range(len(activity)):
+                activity[i] *= 1e-20
+            self.cla_inc *= 1e-20
+
+    def decayActivities(self, decay = 0.999):
+        self.cla_inc /= decay
+
+    def compact(self, removed):
+        """
+        drop the clauses in removed and renumber the others in order.
+        :return: list mapping every old cref to its new cref, -1 if removed
+        """
+        lits = array('i')
+        start = array('i')
+        size = array('i')
+        cid = array('i')
+        learnt = array('b')
+        lbd = array('i')
+        activity = array('d')
+        remap = [-1] * len(self.start)
+        old_lits = self.lits
+        registry = self.registry
+        for cref in range(len(self.start)):
+            if cref in removed:
+                if self.learnt[cref]:
+                    self.num_learnts -= 1
+                    self.learnt_lits -= self.size[cref]
+                del registry[self.cid[cref]]
+                continue
+            remap[cref] = len(start)
+            registry[self.cid[cref]] = len(start)
+            s = self.start[cref]
+            start.append(len(lits))
+            size.append(self.size[cref])
+            lits.extend(old_lits[s:s + self.size[cref]])
+            cid.append(self.cid[cref])
+            learnt.append(self.learnt[cref])
+            lbd.append(self.lbd[cref])
+            activity.append(self.activity[cref])
+        self.lits, self.start, self.size, self.cid = lits, start, size, cid
+        self.learnt, self.lbd, self.activity = learnt, lbd, activity
+        return remap
 
 class Node:
     """
@@ -140,6 +472,9 @@ class Node:
         self.obsoleteFalse = False
 
     def setInd(self, ind):
+        # the branches refuted under another index do not hold for this one
+        if ind != self.ind:
+            self.obsoleteTrue = self.obsoleteFalse = False
         self.ind = ind
 
     def setObsoleteTrue(self):
@@ -149,13 +484,12 @@ class Node:
         self.obsoleteFalse = True
 
     # when some assignment is made by unit propagation or decision
+    # the branch may be refuted already when the assignment is implied
     def connect(self, node, is_left):
 
         if is_left:
-            assert not self.obsoleteTrue
             self.left = node
         else:
-            assert not self.obsoleteFalse
             self.right = node
         node.parent = self
 
@@ -173,411 +507,1393 @@ class SearchTree:
 def printClauses(clauses):
     print("".join(map(str, clauses)))
 
-def find_clause_with_cid(clauses : list[Clause], cid):
+def find_clause_with_cid(clauses, cid):
     assert cid != -1
+    if isinstance(clauses, ClauseDB):
+        return clauses.clauseOf(cid)
     for clause in clauses:
         if clause.cid == cid:
             return clause
 
     raise KeyError
 
-def resolvent(c1 : Clause, c2 : Clause):
-    l1 = c1.getIndexOfLiterals()
-    l2 = c2.getIndexOfLiterals()
-    # common indexes - should be size 1
-    # else, resolution cannot be defined
-    intersect = l1 & l2
-    #print(f"resolution : {c1} and {c2}")
-
-    comp = set()
-    for i in intersect:
-        assert c1.isInvolved(i) and c2.isInvolved(i)
-        if c1.literals[i].isNegation != c2.literals[i].isNegation:
-            comp.add(i)
-    assert len(comp) == 1
-
-    # exclude complementary literals
-    # include common literals only once
-    c = Clause()
-    for l in l1 - comp:
-        c.addLiteral(c1.literals[l])
-    for l in l2 - intersect:
-        c.addLiteral(c2.literals[l])
-
-    return c
-
-def assign(F, clauses, A):
-    ret_clauses = []
-    is_conflict = False
-    conflict_clauses = []
+class Trail:
+    """
+    assignments in the order they were made, split into decision levels.
+    every decision opens a new level, and backjumping to a level only
+    undoes the assignments made above it.
+    """
+    def __init__(self):
+        # {index : Assignment}
+        self.A = {}
+        # list of order that the variables' value is allocated
+        self.order = []
+        # position in order where each decision level starts
+        self.trail_lim = []
+        # VarOrder to put the unassigned variables back into, if any
+        self.var_order = None
+        # saved phase of every variable : its last value (1 for true), if any
+        self.phase = None
+        # counters of the search (see search), if any
+        self.stats = None
+
+    def decisionLevel(self):
+        return len(self.trail_lim)
+
+    def newLevel(self):
+        # a decision level without any assignment
+        self.trail_lim.append(len(self.order))
+
+    def decide(self, ind, value):
+        if self.stats is not None:
+            self.stats['decisions'] += 1
+        self.trail_lim.append(len(self.order))
+        self.A[ind] = Assignment(ind, value, TYPE_DECISION, len(self.trail_lim))
+        self.order.append(ind)
+
+    def imply(self, ind, value, cref):
+        a = Assignment(ind, value, TYPE_IMPLIED, len(self.trail_lim))
+        a.setImpliedClause(cref)
+        self.A[ind] = a
+        self.order.append(ind)
+
+    def cancelUntil(self, level):
+        # undo every assignment above the given decision level
+        if len(self.trail_lim) <= level:
+            return
+        A = self.A
+        order = self.order
+        var_order = self.var_order
+        phase = self.phase
+        for pos in range(len(order) - 1, self.trail_lim[level] - 1, -1):
+            ind = order[pos]
+            if phase is not None:
+                phase[ind] = A[ind].value
+            del A[ind]
+            if var_order is not None:
+                var_order.insert(ind)
+        del order[self.trail_lim[level]:]
+        del self.trail_lim[level:]
+
+def analyze(db : ClauseDB, trail : Trail, cref, seen, var_order = None):
+    """
+    first-UIP conflict analysis, followed by recursive minimization.
+    the conflict clause must have a literal at the current decision level.
+    :param cref: conflicting clause
+    :param seen: per-variable marks, all cleared on return
+    :param var_order: VarOrder whose activities are bumped for every variable in the conflict
+    :return: literals of the learned clause. the first one is the asserting literal,
+    the second one (if any) is from the highest level among the others.
+    """
+    lits = db.lits
+    start = db.start
+    size = db.size
+    A = trail.A
+    order = trail.order
+    level = trail.decisionLevel()
+
+    learnt = [0]
+    path = 0 # number of marked literals of the current level left to resolve
+    ind = -1
+    pos = len(order) - 1
+    while True:
+        s = start[cref]
+        if db.learnt[cref]:
+            db.bumpActivity(cref)
+        for lit in lits[s:s + size[cref]]:
+            v = lit >> 1
+            if v == ind or seen[v]:
+                continue
+            a = A[v]
+            # level 0 literals are false for good
+            if a.level > 0:
+                seen[v] = 1
+                if var_order is not None:
+                    var_order.bump(v)
+                if a.level >= level:
+                    path += 1
+                else:
+                    learnt.append(lit)
+
+        # resolve with the reason of the last marked assignment
+        while not seen[order[pos]]:
+            pos -= 1
+        ind = order[pos]
+        pos -= 1
+        seen[ind] = 0
+        path -= 1
+        if path == 0:
+            break
+        cref = A[ind].impliedClause
+    learnt[0] = 2 * ind + int(A[ind].value)
+
+    # drop the literals implied by the other literals of the clause
+    abstract = 0
+    for lit in learnt[1:]:
+        abstract |= 1 << (A[lit >> 1].level & 31)
+    cleared = learnt[1:]
+    j = 1
+    for lit in learnt[1:]:
+        if A[lit >> 1].impliedClause is None or not lit_redundant(db, A, lit, abstract, seen, cleared):
+            learnt[j] = lit
+            j += 1
+    del learnt[j:]
+    for lit in cleared:
+        seen[lit >> 1] = 0
+
+    # the literal of the highest level watches with the asserting one
+    if len(learnt) > 1:
+        top = max(range(1, len(learnt)), key=lambda p: A[learnt[p] >> 1].level)
+        learnt[1], learnt[top] = learnt[top], learnt[1]
+    return learnt
+
+def lit_redundant(db : ClauseDB, A, lit, abstract, seen, cleared):
+    # whether lit is implied by literals already in the learned clause (marked in seen).
+    # abstract is the set of their levels, hashed into bits, to fail early.
+    lits = db.lits
+    start = db.start
+    size = db.size
+    stack = [lit]
+    top = len(cleared)
+    while stack:
+        ind = stack.pop() >> 1
+        cref = A[ind].impliedClause
+        s = start[cref]
+        for q in lits[s:s + size[cref]]:
+            v = q >> 1
+            if v == ind or seen[v]:
+                continue
+            a = A[v]
+            if a.level == 0:
+                continue
+            if a.impliedClause is not None and (abstract >> (a.level & 31)) & 1:
+                seen[v] = 1
+                stack.append(q)
+                cleared.append(q)
+            else:
+                for c in cleared[top:]:
+                    seen[c >> 1] = 0
+                del cleared[top:]
+                return False
+    return True
 
-    for clause in clauses:
-        ret_clause = clause.makeAssign(A)
-        if ret_clause == (None, False):
-            #when conflict
-            is_conflict = True
-            parent_clause = find_clause_with_cid(clauses, clause.parentid)
-            for ind in parent_clause.getIndexOfLiterals():
-                assert ind in A.keys()
-            conflict_clauses.append(parent_clause)
+class VarOrder:
+    """
+    variable activities of the VSIDS decision heuristic, in an indexed binary max-heap.
+    instead of decaying every activity after a conflict, the bump increment grows
+    by 1 / decay (EVSIDS), and everything is rescaled before it overflows.
+    """
+    def __init__(self, k, decay = 0.95):
+        self.activity = [0.0] * k
+        self.inc = 1.0
+        self.decay = decay
+        self.heap = list(range(k))
+        # position of each variable in heap, -1 if it is not in it
+        self.indices = list(range(k))
+
+    def __len__(self):
+        return len(self.heap)
+
+    def bump(self, ind):
+        activity = self.activity
+        activity[ind] += self.inc
+        if activity[ind] > 1e100:
+            for i in range(len(activity)):
+                activity[i] *= 1e-100
+            self.inc *= 1e-100
+        if self.indices[ind] >= 0:
+            self._up(self.indices[ind])
+
+    def decayActivities(self):
+        self.inc /= self.decay
+
+    def grow(self, k):
+        # add the variables from len(activity) to k, with no activity
+        for ind in range(len(self.activity), k):
+            self.activity.append(0.0)
+            self.indices.append(-1)
+            self.insert(ind)
+
+    def insert(self, ind):
+        if self.indices[ind] >= 0:
+            return
+        self.indices[ind] = len(self.heap)
+        self.heap.append(ind)
+        self._up(len(self.heap) - 1)
+
+    def removeMax(self):
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        self.indices[top] = -1
+        if heap:
+            heap[0] = last
+            self.indices[last] = 0
+            self._down(0)
+        return top
+
+    def pick(self, A):
+        # the unassigned variable with the highest activity.
+        # assigned variables are only dropped from the heap here.
+        while self.heap:
+            ind = self.removeMax()
+            if ind not in A:
+                return ind
+        return None
+
+    def peek(self, A):
+        # the variable pick would return, left in the heap
+        while self.heap and self.heap[0] in A:
+            self.removeMax()
+        return self.heap[0] if self.heap else None
+
+    def _up(self, pos):
+        heap = self.heap
+        indices = self.indices
+        activity = self.activity
+        ind = heap[pos]
+        act = activity[ind]
+        while pos > 0:
+            parent = (pos - 1) >> 1
+            if activity[heap[parent]] >= act:
+                break
+            heap[pos] = heap[parent]
+            indices[heap[pos]] = pos
+            pos = parent
+        heap[pos] = ind
+        indices[ind] = pos
+
+    def _down(self, pos):
+        heap = self.heap
+        indices = self.indices
+        activity = self.activity
+        n = len(heap)
+        ind = heap[pos]
+        act = activity[ind]
+        while True:
+            child = 2 * pos + 1
+            if child >= n:
+                break
+            if child + 1 < n and activity[heap[child + 1]] > activity[heap[child]]:
+                child += 1
+            if activity[heap[child]] <= act:
+                break
+            heap[pos] = heap[child]
+            indices[heap[pos]] = pos
+            pos = child
+        heap[pos] = ind
+        indices[ind] = pos
+
+def luby(i):
+    # i-th element (from 0) of the luby sequence 1, 1, 2, 1, 1, 2, 4, 1, ...
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+    return 1 << seq
+
+class LubyRestart:
+    """
+    restart after luby(i) * unit conflicts since the i-th restart.
+    """
+    def __init__(self, unit = 100):
+        self.unit = unit
+        self.restarts = 0
+        self.conflicts = 0
 
-        #when clause is already satisfied, we can just ignore it
-        elif ret_clause != (None, True):
-            ret_clauses.append(ret_clause[0])
+    def __str__(self):
+        return f"luby, restart {self.restarts + 1} after {self.conflicts} conflicts"
 
-    return ret_clauses, is_conflict, conflict_clauses
+    def onConflict(self, lbd, trail_size):
+        self.conflicts += 1
 
-# n is the number of clauses
-# k is the number of variables
-def solve(clauses : list[Clause], n, k):
-    """
-    :param clauses:
-    :param n: num of clauses
-    :param k: num of variables
-    :return: (Assignments(if satisfiable), isSat (true / false)
-    """
+    def shouldRestart(self):
+        return self.conflicts >= luby(self.restarts) * self.unit
 
-    print(f"Starting to solve SAT with method {decisions[DECISION_MODE]}...")
+    def onRestart(self):
+        self.restarts += 1
+        self.conflicts = 0
 
-    #Initialise A to the empty list of assignments
-    global num_of_clauses
-    F = copy.deepcopy(clauses)
-    A = {}
-    order = [] #list of order that the variables' value is allocated
-    ind_lists = [i for i in range(k)] # list of all variable numbers. todo : find a method to init according to the input
-    num_of_clauses = n
+class GlucoseRestart:
+    """
+    restart when the learned clauses get worse than usual : when the average lbd
+    of the last window_size conflicts times k is above the average of all conflicts.
+    a restart is blocked when the trail is much longer than usual,
+    since the search may be close to a model.
+    """
+    def __init__(self, window_size = 50, k = 0.8, blocking_size = 5000, r = 1.4):
+        self.lbd_queue = deque(maxlen=window_size)
+        self.lbd_queue_sum = 0
+        self.lbd_total = 0
+        self.trail_queue = deque(maxlen=blocking_size)
+        self.trail_queue_sum = 0
+        self.k = k
+        self.r = r
+        self.conflicts = 0
+        self.restarts = 0
 
-    tree = SearchTree()
-    tree_pos = tree.head # for dfs method
+    def __str__(self):
+        return f"glucose, restart {self.restarts + 1} at conflict {self.conflicts}"
+
+    def onConflict(self, lbd, trail_size):
+        self.conflicts += 1
+        self.lbd_total += lbd
+
+        if len(self.trail_queue) == self.trail_queue.maxlen:
+            self.trail_queue_sum -= self.trail_queue[0]
+        self.trail_queue.append(trail_size)
+        self.trail_queue_sum += trail_size
+        if self.conflicts > 10000 and len(self.lbd_queue) == self.lbd_queue.maxlen \
+                and len(self.trail_queue) == self.trail_queue.maxlen \
+                and trail_size > self.r * self.trail_queue_sum / len(self.trail_queue):
+            self.lbd_queue.clear()
+            self.lbd_queue_sum = 0
+
+        if len(self.lbd_queue) == self.lbd_queue.maxlen:
+            self.lbd_queue_sum -= self.lbd_queue[0]
+        self.lbd_queue.append(lbd)
+        self.lbd_queue_sum += lbd
+
+    def shouldRestart(self):
+        return len(self.lbd_queue) == self.lbd_queue.maxlen \
+            and self.lbd_queue_sum / len(self.lbd_queue) * self.k > self.lbd_total / self.conflicts
+
+    def onRestart(self):
+        self.restarts += 1
+        self.lbd_queue.clear()
+        self.lbd_queue_sum = 0
+
+restart_policies = {
+    RESTART_LUBY: LubyRestart,
+    RESTART_GLUCOSE: GlucoseRestart
+}
 
-    recent_buffer_size = n // 5
-    recent_buffer = []
-    recent_avg = 0
-    conflict_buffer = []
-    conflict_buffer_size = 24
-    minimal_conflict_level = 4
-    minimal_conflict_number = 0
+def remaining_clauses(db : ClauseDB, A):
+    # input clauses not yet satisfied under A, reduced to their unassigned literals.
+    # only the greedy decision strategies look at the residual formula.
+    ret_clauses = []
+    lits = db.lits
+    for cref in range(len(db)):
+        if db.learnt[cref]:
+            continue
+        s = db.start[cref]
+        ret_clause = Clause(cid=-1, parentid=db.cid[cref])
+        for lit in lits[s:s + db.size[cref]]:
+            a = A.get(lit >> 1)
+            if a is None:
+                ret_clause.lits.append(lit)
+            elif a.value != (lit & 1):
+                break
+        else:
+            ret_clauses.append(ret_clause)
+    return ret_clauses
 
-    while True:
-        # Unit Propagation.
-        # While there is a unit clause {L} in F|A, add L->1 to A.
-        print("------------------------------------------------------------")
-
-        if print_clause:
-            print("clause lists : ")
-            for clause in F:
-                print(clause)
-
-        # should consider no unit prop
-        F, is_conflict, conflict_clauses = assign(F, clauses, A)
-        if F == [] and is_conflict == False:
-            print("found satisfying assignment")
-            return A, True
-
-        while not is_conflict:
-            has_unit_clause = False
-
-            for clause in F:
-                if clause.isUnitClause():
-                    L = list(clause.literals.values())[0]
-                    has_unit_clause = True
-                    assert L.ind not in A.keys()
-
-                    if clause.cid == -1:
-                        parent = find_clause_with_cid(clauses, clause.parentid)
+class Propagator:
+    """
+    two-watched-literal unit propagation over a ClauseDB.
+    every clause with two or more literals watches the first two literals of
+    its slice in db.lits, and a clause is only visited when one of them becomes false.
+    """
+    def __init__(self, db : ClauseDB, trail : Trail, k):
+        self.db = db
+        self.trail = trail
+        self.watches = [[] for _ in range(2 * k)]
+        # unit and empty clauses cannot be watched, they are enqueued at level 0
+        self.units = []
+        self.uhead = 0
+        # position in trail.order up to which the assignments were propagated
+        self.qhead = 0
+        # num of assignments propagated
+        self.propagations = 0
+        # DratWriter of the clauses derived and deleted (see proof.py), if any
+        self.proof = None
+        for cref in range(len(db)):
+            self.attach(cref)
+
+    def attach(self, cref):
+        db = self.db
+        if db.size[cref] < 2:
+            self.units.append(cref)
+            return
+        s = db.start[cref]
+        self.watches[db.lits[s]].append(cref)
+        self.watches[db.lits[s + 1]].append(cref)
+
+    def cancelUntil(self, level):
+        # the assignments kept were all propagated before the next decision
+        self.trail.cancelUntil(level)
+        self.qhead = min(self.qhead, len(self.trail.order))
+
+    def addAtRoot(self, lits, cid = -1, learnt = True):
+        """
+        add a clause at level 0, without its literals false at level 0.
+        :return: False if every literal is false
+        """
+        A = self.trail.A
+        kept = []
+        for lit in lits:
+            a = A.get(lit >> 1)
+            if a is None:
+                kept.append(lit)
+            elif a.value != (lit & 1):
+                # satisfied at level 0
+                return True
+        if not kept:
+            return False
+        if self.proof is not None and len(kept) < len(lits):
+            self.proof.add(kept)
+        self.attach(self.db.add(kept, cid, learnt=learnt, lbd=len(kept) if learnt else 0))
+        return True
+
+    def reasonOf(self, ind):
+        # the clause that implied the assignment of ind, None for a decision or a free variable
+        a = self.trail.A.get(ind)
+        if a is None or a.impliedClause is None:
+            return None
+        return self.db.clause(a.impliedClause)
+
+    def locked(self, cref):
+        # whether cref is the reason of a current assignment.
+        # an implying clause always has the implied literal first.
+        a = self.trail.A.get(self.db.lits[self.db.start[cref]] >> 1)
+        return a is not None and a.impliedClause == cref
+
+    def reduceDB(self, keep_glue = True, max_learnts = None, max_memory = None):
+        """
+        delete the worse half of the learned clauses, by lbd and then by activity,
+        and compact the database. clauses that are the reason of an assignment are kept,
+        and so are glue clauses (lbd <= 2) unless keep_glue is False.
+        :param max_learnts: num of learned clauses to delete down to, if more than half, if given
+        :param max_memory: learntMemory to delete down to, if more than half, if given
+        :return: list mapping every old cref to its new cref, -1 if deleted
+        """
+        db = self.db
+        candidates = [cref for cref in range(len(db))
+                      if db.learnt[cref] and db.size[cref] > 1
+                      and not (keep_glue and db.lbd[cref] <= 2) and not self.locked(cref)]
+        candidates.sort(key=lambda cref: (-db.lbd[cref], db.activity[cref]))
+        count = len(candidates) // 2
+        num_learnts, memory = db.num_learnts - count, db.learntMemory()
+        for cref in candidates[:count]:
+            memory -= db.size[cref] * db.lits.itemsize + 25
+        # past the half, the worse clauses left are deleted while over a ceiling
+        while count < len(candidates) and (max_learnts is not None and num_learnts > max_learnts
+                                           or max_memory is not None and memory > max_memory):
+            memory -= db.size[candidates[count]] * db.lits.itemsize + 25
+            num_learnts -= 1
+            count += 1
+        removed = set(candidates[:count])
+        if self.proof is not None:
+            for cref in removed:
+                self.proof.delete(db.literalsOf(cref))
+        remap = db.compact(removed)
+
+        for watchers in self.watches:
+            watchers.clear()
+        units = self.units
+        self.units = []
+        for cref in range(len(db)):
+            if db.size[cref] > 1:
+                self.attach(cref)
+        # unit clauses are never deleted, and stay in the same order
+        self.units = [remap[cref] for cref in units]
+        for a in self.trail.A.values():
+            if a.impliedClause is not None:
+                a.impliedClause = remap[a.impliedClause]
+        return remap
+
+    def propagate(self):
+        """
+        propagate every assignment in trail.order[qhead:], adding implied assignments.
+        :return: cref of the conflicting clause, or None
+        """
+        db = self.db
+        lits = db.lits
+        start = db.start
+        size = db.size
+        trail = self.trail
+        A = trail.A
+        order = trail.order
+
+        while self.uhead < len(self.units):
+            cref = self.units[self.uhead]
+            if size[cref] == 0:
+                return cref
+            lit = lits[start[cref]]
+            a = A.get(lit >> 1)
+            if a is None:
+                trail.imply(lit >> 1, not (lit & 1), cref)
+            elif a.value == (lit & 1):
+                return cref
+            self.uhead += 1
+
+        watches = self.watches
+        qhead = self.qhead
+        while self.qhead < len(order):
+            ind = order[self.qhead]
+            self.qhead += 1
+            # the literal of ind that has just become false
+            false_lit = 2 * ind + int(A[ind].value)
+            watchers = watches[false_lit]
+            i = j = 0
+            n = len(watchers)
+            while i < n:
+                cref = watchers[i]
+                i += 1
+                s = start[cref]
+                # keep the false literal at the second position
+                if lits[s] == false_lit:
+                    lits[s] = lits[s + 1]
+                    lits[s + 1] = false_lit
+                other = lits[s]
+                a = A.get(other >> 1)
+                if a is not None and a.value != (other & 1):
+                    # already satisfied by the other watched literal
+                    watchers[j] = cref
+                    j += 1
+                    continue
+
+                # look for a literal which is not false to watch instead
+                for p in range(s + 2, s + size[cref]):
+                    lit = lits[p]
+                    b = A.get(lit >> 1)
+                    if b is None or b.value != (lit & 1):
+                        lits[s + 1] = lit
+                        lits[p] = false_lit
+                        watches[lit].append(cref)
+                        break
+                else:
+                    watchers[j] = cref
+                    j += 1
+                    if a is None:
+                        # every other literal is false : unit clause
+                        trail.imply(other >> 1, not (other & 1), cref)
                     else:
-                        parent = clause
+                        # every literal is false : conflict
+                        while i < n:
+                            watchers[j] = watchers[i]
+                            i += 1
+                            j += 1
+                        del watchers[j:]
+                        # ind is propagated again if it is kept by the backjump,
+                        # as later assignments may be kept unpropagated with it
+                        self.qhead -= 1
+                        self.propagations += self.qhead - qhead
+                        return cref
+            del watchers[j:]
+
+        self.propagations += self.qhead - qhead
+        return None
+
+def falsified_clauses(db : ClauseDB, A):
+    """
+    :param A: {index : Assignment}, or {index : value}
+    :return: list of the crefs of the clauses of db not satisfied by A
+    """
+    values = {ind: a if isinstance(a, bool) else a.value for ind, a in A.items()}
+    falsified = []
+    for cref in range(len(db)):
+        if not any(values.get(lit >> 1) == (not (lit & 1)) for lit in db.literalsOf(cref)):
+            falsified.append(cref)
+    return falsified
 
-                    # conflict when the constraint not fits with current A
-                    # if in conflict, a learned clause should be added.
-                    A[L.ind] = Assignment(L.ind, False, TYPE_IMPLIED) if L.isNegation \
-                        else Assignment(L.ind, True, TYPE_IMPLIED)
-                    A[L.ind].setImpliedClause(parent)
+# n is the number of clauses
+# k is the number of variables
+def solve(clauses : list[Clause] | ClauseDB, n, k, stats = None, proof = None, budget = None, progress = None,
+          config = None):
+    """
+    :param clauses: list of clauses, or a ClauseDB (which is not modified)
+    :param n: num of clauses
+    :param k: num of variables
+    :param stats: dict filled with the counters of the search and the time of every phase, if given
+    :param proof: DratWriter (see proof.py) the proof of unsatisfiability is streamed to, if given
+    :param budget: Budget of the search, if given
+    :param progress: called with stats every PROGRESS_PERIOD seconds of the search, if given
+    :param config: Config of the solve, the module settings by default
+    :return: (Assignments(if satisfiable), isSat (true / false / None if the budget ran out)
+    """
+    config = Config() if config is None else config
+    mode = config.decision_mode
+    if proof is not None and mode in (DECISION_MULTITHREAD, DECISION_CUBE):
+        raise ValueError(f"proofs are not supported by the {decisions[mode]} decision mode")
+    stats = {} if stats is None else stats
+    db = clauses if isinstance(clauses, ClauseDB) else ClauseDB(clauses)
+    if k <= config.small_formula_vars and proof is None:
+        from bitsolver import solve_small
+        return solve_small(db, n, k, stats=stats, budget=budget, progress=progress, config=config)
+    if not config.preprocess:
+        if mode == DECISION_MULTITHREAD:
+            from portfolio import solve_portfolio
+            return solve_portfolio(db, n, k, stats=stats, budget=budget, config=config)
+        if mode == DECISION_CUBE:
+            from cube import solve_cubes
+            return solve_cubes(db, n, k, stats=stats, budget=budget, config=config)
+        if mode == DECISION_LOCAL:
+            from localsearch import solve_local
+            return solve_local(db.copy() if db is clauses else db, n, k, stats=stats, proof=proof,
+                               budget=budget, progress=progress, config=config)
+        return search(db.copy() if db is clauses else db, n, k, stats=stats, proof=proof,
+                      budget=budget, progress=progress, config=config)
+
+    from preprocess import preprocess
+    start = time.time()
+    simplified, preprocessor = preprocess(db, k, proof, budget, config)
+    stats['time_preprocess'] = time.time() - start
+    if preprocessor.stopped is not None:
+        log.info(f"preprocessing stopped : {preprocessor.stopped}, returning unknown")
+        return {}, None
+    if budget is not None:
+        budget = budget.after(stats['time_preprocess'])
+    log.info(f"preprocessing : {preprocessor}")
+    if simplified is None:
+        log.info("empty clause derived in preprocessing, returning unsat")
+        return {}, False
+    if mode == DECISION_MULTITHREAD:
+        from portfolio import solve_portfolio
+        A, is_sat = solve_portfolio(simplified, n, k, stats=stats, budget=budget, config=config)
+    elif mode == DECISION_CUBE:
+        from cube import solve_cubes
+        A, is_sat = solve_cubes(simplified, n, k, stats=stats, budget=budget, config=config)
+    elif mode == DECISION_LOCAL:
+        from localsearch import solve_local
+        A, is_sat = solve_local(simplified, n, k, stats=stats, proof=proof, budget=budget, progress=progress,
+                                config=config)
+    else:
+        A, is_sat = search(simplified, n, k, stats=stats, proof=proof, budget=budget, progress=progress,
+                           config=config)
+    if is_sat:
+        preprocessor.extendModel(A)
+    return A, is_sat
+
+def search(db : ClauseDB, n, k, exchange = None, stats = None, proof = None, budget = None, progress = None,
+           config = None):
+    """
+    cdcl search, which adds learned clauses to db.
+    :param db: clauses
+    :param n: num of clauses
+    :param k: num of variables
+    :param exchange: ClauseExchange of a portfolio worker (see portfolio.py), or None
+    :param stats: dict filled with the counters of the search, if given
+    :param proof: DratWriter the learned and deleted clauses are written to, if given
+    :param budget: Budget of the search, if given
+    :param progress: called with stats every PROGRESS_PERIOD seconds, if given
+    :param config: Config of the search, the module settings by default
+    :return: (Assignments(if satisfiable), isSat (true / false / None if the budget ran out)
+    """
+    solver = Solver(k, db, n, stats=stats, proof=proof, config=config)
+    solver.exchange = exchange
+    is_sat = solver.solve(budget=budget, progress=progress)
+    return solver.model, is_sat
 
-                    order.append(L.ind)
+def print_stats(stats, file = None):
+    """
+    print stats as dimacs comment lines, with the throughput of the search.
+    :param file: stdout by default
+    """
+    file = sys.stdout if file is None else file
+    for name, value in stats.items():
+        if isinstance(value, float):
+            value = f"{value:.3f} s"
+        print(f"c {name:<18} : {value}", file=file)
+    elapsed = stats.get('time_search')
+    if elapsed:
+        for name in ('conflicts', 'decisions', 'propagations'):
+            if name in stats:
+                print(f"c {name + '/s':<18} : {stats[name] / elapsed:.0f}", file=file)
+
+class Solver:
+    """
+    incremental cdcl solver.
+    clauses can be added between calls of solve, which may be given assumptions.
+    learned clauses, the activities of the decision heuristic and the assignments
+    of level 0 are kept from one call to the next.
+    the public methods take literals as dimacs integers : v or -v for the variable v.
+    a solver owns its settings (see Config), clauses, statistics and random generator,
+    and no module state changes while it runs, so solvers can run in threads at the same time.
+    """
+    def __init__(self, k = 0, db : ClauseDB = None, n = None, stats = None, proof = None, config = None):
+        """
+        :param k: num of variables, grown by add_clause and solve as needed
+        :param db: clauses to start from, which the solver takes over
+        :param n: num of input clauses, for the restart heuristic of DECISION_RESTART
+        :param stats: dict filled with the counters of the search (see STATS), if given
+        :param proof: DratWriter (see proof.py) the learned and deleted clauses are written to, if given.
+        it proves the unsatisfiability of the clauses added so far when solve fails without assumptions
+        :param config: Config of the solver, the module settings when it is made by default.
+        the multithread, cube and local decision modes are run by solve, not by a Solver
+        """
+        self.config = config = Config() if config is None else config
+        if config.decision_mode in (DECISION_MULTITHREAD, DECISION_CUBE, DECISION_LOCAL):
+            raise ValueError(f"the {decisions[config.decision_mode]} decision mode is run by solve, not by Solver")
+        self.random = config.newRandom()
+        self.k = k
+        self.db = ClauseDB() if db is None else db
+        self.n = n
+        self.mode = config.decision_mode
+        self.trail = Trail()
+        self.stats = {} if stats is None else stats
+        self.stats.update(dict.fromkeys(STATS, 0), time_search=0.0)
+        self.trail.stats = self.stats
+        self.seen = bytearray(k) # marks of the conflict analysis
+        self.var_order = None
+        if self.mode == DECISION_VSIDS:
+            self.var_order = VarOrder(k)
+            self.trail.var_order = self.var_order
+        # saved phases, and the values of the longest trails without conflict (see PHASE_SAVING)
+        if config.phase_saving:
+            self.trail.phase = bytearray(k)
+        self.target = bytearray([NO_PHASE]) * k
+        self.best = bytearray([NO_PHASE]) * k
+        # variables of the target
+        self.target_order = []
+        self.target_size = self.best_size = 0
+        self.rephases = 0
+        self.next_rephase = config.rephase_interval
+        self.restart_policy = None
+        # the search tree of dfs has to follow every assignment from the first decision
+        policy = config.restart_policy
+        if policy is None:
+            policy = RESTART_LUBY if self.mode == DECISION_VSIDS else RESTART_NONE
+        if policy != RESTART_NONE and self.mode != DECISION_DFS:
+            self.restart_policy = restart_policies[policy]()
+        self.propagator = Propagator(self.db, self.trail, k)
+        self.proof = self.propagator.proof = proof
+        # ClauseExchange of a portfolio worker, if any
+        self.exchange = None
+        self.conflicts = 0
+        self.restarts = 0
+        self.reductions = 0
+        self.learned_clauses = 0
+        self.learned_literals = 0
+        self.next_reduce = config.reduce_first
+        # learned clauses at the last reduction, which the ceilings do not force again before new ones
+        self.reduced_learned = 0
+        # False once the clauses are unsatisfiable without any assumption
+        self.ok = True
+        # {index : Assignment} found by the last call of solve, if satisfiable
+        self.model = {}
+        # assumptions of the last call of solve which are enough to make it unsatisfiable
+        self.core = []
+        # set by interrupt, until a solve gives up because of it
+        self.interrupted = False
+        # the limit which made the last call of solve give up, if any
+        self.stopped = None
+
+    def grow(self, k):
+        # make room for the variables below k
+        if k <= self.k:
+            return
+        self.propagator.watches.extend([] for _ in range(2 * (k - self.k)))
+        self.seen.extend(bytes(k - self.k))
+        if self.trail.phase is not None:
+            self.trail.phase.extend(bytes(k - self.k))
+        self.target.extend(bytes([NO_PHASE]) * (k - self.k))
+        self.best.extend(bytes([NO_PHASE]) * (k - self.k))
+        if self.var_order is not None:
+            self.var_order.grow(k)
+        self.k = k
+
+    def newVar(self):
+        self.grow(self.k + 1)
+        return self.k
+
+    def add_clause(self, clause):
+        """
+        :param clause: dimacs literals
+        :return: False if the clauses are unsatisfiable from now on
+        """
+        lits = [from_dimacs(v) for v in clause]
+        self.grow(max((lit >> 1) + 1 for lit in lits) if lits else 0)
+        self.propagator.cancelUntil(0)
+        if self.ok:
+            self.ok = self.propagator.addAtRoot(list(dict.fromkeys(lits)), learnt=False)
+            if not self.ok and self.proof is not None:
+                self.proof.add([])
+        return self.ok
+
+    def interrupt(self):
+        """
+        make the running solve, or the next one, give up with None.
+        it only sets a flag, so it can be called from another thread or from a signal handler.
+        """
+        self.interrupted = True
+
+    def solve(self, assumptions = (), budget = None, progress = None):
+        """
+        :param assumptions: dimacs literals taken as true for this call only
+        :param budget: Budget of this call, if given. its conflicts and propagations are counted from the call
+        :param progress: called with stats every PROGRESS_PERIOD seconds, if given
+        :return: isSat (true / false / None if the budget ran out or the solve was interrupted).
+        the assignments are in model if satisfiable, and core holds the failed assumptions if not.
+        """
+        lits = [from_dimacs(v) for v in assumptions]
+        if lits and self.mode == DECISION_DFS:
+            raise ValueError("assumptions are not supported by the dfs decision mode")
+        self.grow(max((lit >> 1) + 1 for lit in lits) if lits else 0)
+        self.propagator.cancelUntil(0)
+        self.model, self.core, self.stopped = {}, [], None
+        if not self.ok:
+            return False
+        self.last_update = time.time()
+        try:
+            is_sat = self.search(lits, budget or Budget(), progress)
+        finally:
+            self.updateStats()
+        if is_sat:
+            self.model = dict(self.trail.A)
+        elif is_sat is None:
+            log.info(f"giving up : {self.stopped}")
+        else:
+            self.core = [to_dimacs(lit) for lit in self.core]
+            if self.proof is not None and (not self.ok or not lits):
+                # the proof ends with the empty clause
+                self.proof.add([])
+        return is_sat
+
+    def updateStats(self):
+        # the counters kept by the search loop are copied to stats after every call of solve,
+        # and before every progress report
+        now = time.time()
+        stats = self.stats
+        stats['conflicts'] = self.conflicts
+        stats['propagations'] = self.propagator.propagations
+        stats['restarts'] = self.restarts
+        stats['learned_clauses'] = self.learned_clauses
+        stats['learned_literals'] = self.learned_literals
+        stats['reductions'] = self.reductions
+        stats['time_search'] += now - self.last_update
+        self.last_update = now
+
+    def checkBudget(self, budget, propagations, deadline):
+        """
+        :param propagations: num of propagations the budget allows
+        :param deadline: time the budget ends at
+        :return: the limit of budget which is reached, or None
+        """
+        if budget.interrupted:
+            return 'interrupted'
+        if self.propagator.propagations >= propagations:
+            return f"{budget.propagations} propagations"
+        if time.time() >= deadline:
+            return f"{budget.time:.3f} s"
+        if budget.memory is not None:
+            memory = memory_usage()
+            if memory is not None and memory >= budget.memory:
+                return f"{memory} bytes of memory"
+        return None
+
+    def saveTrail(self):
+        # the trail in conflict is the target, or the best one, if it is the longest so far
+        order = self.trail.order
+        A = self.trail.A
+        if len(order) > self.target_size:
+            self.target_size = len(order)
+            target = self.target
+            for ind in self.target_order:
+                target[ind] = NO_PHASE
+            for ind in order:
+                target[ind] = A[ind].value
+            self.target_order = order[:]
+            if len(order) > self.best_size:
+                self.best_size = len(order)
+                self.best[:] = target
+
+    def rephase(self):
+        # reset the saved phases to the next kind of REPHASES
+        rephases = self.config.rephases
+        kind = rephases[self.rephases % len(rephases)]
+        phase = self.trail.phase
+        if kind == 'best':
+            # the variables outside the best trail keep their phase
+            phase[:] = bytes(value if best == NO_PHASE else best for value, best in zip(phase, self.best))
+        elif kind == 'original':
+            phase[:] = bytes(self.k)
+        elif kind == 'inverted':
+            phase[:] = b'\x01' * self.k
+        else:
+            phase[:] = bytes(self.random.getrandbits(1) for _ in range(self.k))
+        # the decisions follow the new phases until the next target
+        self.target[:] = bytes([NO_PHASE]) * self.k
+        self.best[:] = self.target
+        self.target_order = []
+        self.target_size = self.best_size = 0
+        self.rephases += 1
+        self.next_rephase = self.conflicts + self.config.rephase_interval * (self.rephases + 1)
+        log.info(f"rephasing to the {kind} phases")
+
+    def reuseLevel(self, assumptions):
+        """
+        :return: decision level to restart from, keeping the levels whose decisions are more active
+        than the variable vsids would decide next, and the levels of the assumptions
+        """
+        trail = self.trail
+        var_order = self.var_order
+        if not self.config.trail_reuse or var_order is None or self.exchange is not None:
+            # the shared clauses are added at level 0
+            return 0
+        ind = var_order.peek(trail.A)
+        if ind is None:
+            return 0
+        activity = var_order.activity
+        act = activity[ind]
+        for level in range(len(assumptions), trail.decisionLevel()):
+            if activity[trail.order[trail.trail_lim[level]]] < act:
+                return level
+        return trail.decisionLevel()
+
+    def analyzeFinal(self, lit):
+        """
+        :param lit: assumption found false
+        :return: lit and the assumptions which imply its negation
+        """
+        A = self.trail.A
+        order = self.trail.order
+        seen = self.seen
+        db = self.db
+        core = [lit]
+        if A[lit >> 1].level == 0:
+            return core
+        seen[lit >> 1] = 1
+        for pos in range(len(order) - 1, self.trail.trail_lim[0] - 1, -1):
+            ind = order[pos]
+            if not seen[ind]:
+                continue
+            seen[ind] = 0
+            a = A[ind]
+            if a.impliedClause is None:
+                # every decision below the assumption levels is an assumption
+                core.append(2 * ind + int(not a.value))
+            else:
+                for l in db.literalsOf(a.impliedClause)[1:]:
+                    if A[l >> 1].level > 0:
+                        seen[l >> 1] = 1
+        return core
+
+    def search(self, assumptions, budget, progress = None):
+        # cdcl loop. returns True with a full assignment (or one satisfying every clause)
+        # in trail, False if unsatisfiable under the assumptions, and None once budget ran out.
+        db = self.db
+        k = self.k
+        n = max(1, self.n if self.n is not None else len(db) - db.num_learnts)
+        mode = self.mode
+        exchange = self.exchange
+        trail = self.trail
+        A = trail.A
+        order = trail.order
+        seen = self.seen
+        var_order = self.var_order
+        restart_policy = self.restart_policy
+        propagator = self.propagator
+        # tracing is decided once, so that a disabled level costs a test of a local
+        debug = log.isEnabledFor(logging.DEBUG)
+        trace = log.isEnabledFor(TRACE)
+        info = log.isEnabledFor(logging.INFO)
+        # the per-assignment bookkeeping is only needed by these modes
+        hook = mode in (DECISION_DFS, DECISION_RESTART) or trace
+        # only vsids decides from the saved phases
+        config = self.config
+        phases = mode == DECISION_VSIDS and config.phase_saving
+        target_phase = phases and config.target_phase
+        target = self.target
+        phase = trail.phase
+
+        log.info(f"Starting to solve SAT with method {decisions[mode]}...")
+
+        ind_lists = [i for i in range(k)] # list of all variable numbers. todo : find a method to init according to the input
+        num_of_clauses = max(n, db.next_cid - 1)
+        # assignments in order[:hooked] were already seen by the per-assignment bookkeeping
+        hooked = 0
+
+        tree = SearchTree()
+        tree_pos = tree.head # for dfs method
+        # the path from the head to tree_pos follows the trail : the node at depth i holds order[i]
+        tree_depth = 0
+
+        # at least one decision per variable between two restarts, so that small formulas finish
+        recent_buffer_size = max(k, n // 5, 1)
+        recent_buffer = []
+        recent_avg = 0
+        conflict_buffer = []
+        conflict_buffer_size = 24
+        minimal_conflict_level = 4
+        minimal_conflict_number = 0
+
+        inf = float('inf')
+        max_conflicts = inf if budget.conflicts is None else self.conflicts + budget.conflicts
+        max_propagations = inf if budget.propagations is None else propagator.propagations + budget.propagations
+        deadline = inf if budget.time is None else time.time() + budget.time
+        next_progress = time.time() + config.progress_period
+        ticks = config.budget_check
+
+        while True:
+            # the budget is checked between two propagations, where the search can stop at any time
+            if self.interrupted or budget.interrupted or self.conflicts >= max_conflicts:
+                if self.interrupted:
+                    self.interrupted = False
+                    self.stopped = 'interrupted'
+                else:
+                    self.stopped = 'interrupted' if budget.interrupted else f"{budget.conflicts} conflicts"
+                return None
+            ticks -= 1
+            if not ticks:
+                ticks = config.budget_check
+                self.stopped = self.checkBudget(budget, max_propagations, deadline)
+                if self.stopped is not None:
+                    return None
+                if progress is not None and time.time() >= next_progress:
+                    next_progress = time.time() + config.progress_period
+                    self.updateStats()
+                    progress(self.stats)
+
+            # Unit Propagation.
+            # While there is a unit clause {L} in F|A, add L->1 to A.
+            if debug:
+                log.debug("------------------------------------------------------------")
+
+            if trace:
+                log.log(TRACE, "clause lists : ")
+                for clause in remaining_clauses(db, A):
+                    log.log(TRACE, clause)
+
+            # only the clauses watching a literal falsified since the last call are visited
+            conflict_cref = propagator.propagate()
+            is_conflict = conflict_cref is not None
+
+            for ind in order[hooked:] if hook else ():
+                if A[ind].assignmentType == TYPE_DECISION:
+                    continue
+                value = A[ind].value
+
+                # set forced assignment in tree.
+                # the clauses imply it even into a refuted branch, which only guides the decisions
+                if mode == DECISION_DFS:
+                    tree_pos.setInd(ind)
+                    newnode = Node()
+                    tree_pos.connect(newnode, is_left=value)
+                    tree_pos = newnode
+                    tree_depth += 1
 
-                    # set forced assignment in tree. todo
-                    if DECISION_MODE == DECISION_DFS:
-                        tree_pos.setInd(L.ind)
-                        newnode = Node()
-                        is_left = not L.isNegation
+                if mode == DECISION_RESTART:
+                    if len(recent_buffer) < recent_buffer_size:
+                        recent_buffer.append(value)
+                    else:
+                        recent_buffer = recent_buffer[1:] + [value]
+                        recent_avg += (value - recent_buffer[0]) / recent_buffer_size
 
-                        # assert (not is_left) or (tree_pos.left is None)
-                        # assert is_left or (tree_pos.right is None)
+                if trace:
+                    log.log(TRACE, f"assigning new from unit prop : {ind}, {value}")
+            hooked = len(order)
 
-                        if is_left:
-                            tree_pos.setObsoleteFalse()
-                            if tree_pos.obsoleteTrue:
-                                return {}, False #todo. is this right?
-                        else:
-                            tree_pos.setObsoleteTrue()
-                            if tree_pos.obsoleteFalse:
-                                return {}, False
-                        tree_pos.connect(newnode, is_left= is_left)
-                        tree_pos = newnode
+            if is_conflict:
+                if debug:
+                    log.debug("conflict occurred from assigning")
+            else:
+                if debug:
+                    log.debug("unit propagation complete, with no conflict")
+                # every variable is assigned and no clause is falsified.
+                # the assumptions still have to be checked if they are not all made
+                if len(A) == k and trail.decisionLevel() >= len(assumptions):
+                    log.info("found satisfying assignment")
+                    return True
+
+            # If F|A contains an empty clause,
+            # Find a clause C by learning procedure & add it to F.
+            # do the following:
+            if is_conflict:
+                if debug:
+                    log.debug("enter conflict handling")
+                    log.debug(f"conflict clause : {db.clause(conflict_cref)}")
+                if phases:
+                    self.saveTrail()
+                # Suppose A = {p1->b1, ... , pk->bk} leads to conflict.
+                # Pick any conflict clause D_k+1 under A.
+                #assert len(A) == k
+
+                if mode == DECISION_RESTART:
+                    conflict_level = len(order)
+                    if len(conflict_buffer) < conflict_buffer_size:
+                        minimal_conflict_number += int(conflict_level < minimal_conflict_level)
+                        conflict_buffer.append(conflict_level)
+                    else:
+                        minimal_conflict_number += int(conflict_level < minimal_conflict_level) \
+                                                    - int(conflict_buffer[0] < minimal_conflict_level)
+                        conflict_buffer = conflict_buffer[1:] + [conflict_level]
+
+                # a conflict with no literal above level 0 cannot be resolved by any decision.
+                # the decisions above the highest level of the clause took no part in it.
+                clause_level = max((A[lit >> 1].level for lit in db.literalsOf(conflict_cref)), default=0)
+                if clause_level == 0:
+                    log.info("conflict at level 0, returning unsat")
+                    self.ok = False
+                    return False
+                if clause_level < trail.decisionLevel():
+                    propagator.cancelUntil(clause_level)
+                    hooked = min(hooked, len(order))
+
+                # The learned clause is the first UIP of the conflict,
+                # with its asserting literal first.
+                lits = analyze(db, trail, conflict_cref, seen, var_order)
+                self.conflicts += 1
+                self.learned_literals += len(lits)
+                if self.proof is not None:
+                    self.proof.add(lits)
+                if var_order is not None:
+                    var_order.decayActivities()
+                db.decayActivities()
+                # number of distinct decision levels in the learned clause
+                lbd = len({A[lit >> 1].level for lit in lits})
+                if restart_policy is not None:
+                    restart_policy.onConflict(lbd, len(order))
+                # should set the cid to ++num_of_clauses
+                # so that it can be used in another backtracking
+                num_of_clauses += 1
+                if debug:
+                    learned_clause = Clause(cid=num_of_clauses, parentid=num_of_clauses)
+                    learned_clause.lits = array('i', lits)
+                    log.debug(f"added learned clause : {learned_clause}")
+
+                # Go back to the decision level where D1 becomes a unit clause :
+                # the highest level of the other literals in D1.
+                # only the assignments above that level are undone.
+                if trace:
+                    log.log(TRACE, f"order : {order}")
+
+                backjump_level = A[lits[1] >> 1].level if len(lits) > 1 else 0
+
+                # backtracking in tree.
+                # the branch of the last assignment is refuted, and the tree goes back with the trail.
+                # the answer only comes from the clauses, as the tree does not see the learned ones
+                if mode == DECISION_DFS:
+                    if debug:
+                        log.debug("backtrcking in the search tree...")
+                    while tree_depth > len(order):
+                        tree_pos = tree_pos.parent
+                        tree_depth -= 1
+                    last = tree_pos.parent
+                    if A[order[-1]].value == True:
+                        last.setObsoleteTrue()
+                        if debug:
+                            log.debug(f"the left section of node {last.ind} is now obsolete")
+                    else:
+                        last.setObsoleteFalse()
+                        if debug:
+                            log.debug(f"the right section of node {last.ind} is now obsolete")
 
-                    if DECISION_MODE == DECISION_RESTART:
-                        value = A[L.ind].value
-                        if len(recent_buffer) < recent_buffer_size:
-                            recent_buffer.append(value)
-                        else:
-                            recent_buffer = recent_buffer[1:] + [value]
-                            recent_avg += (value - recent_buffer[0]) / recent_buffer_size
-
-                    if print_assign:
-                        print(f"assigning new from unit prop : {L.ind}, {A[L.ind].value}")
-
-                    F, is_conflict, conflict_clauses = assign(clauses, clauses, A)
-                    # if not conflict and no clause returned from assignment, return A.
-                    if F == [] and is_conflict == False:
-                        print("found satisfying assignment")
-                        return A, True
-                    if is_conflict == True:
-                        print("conflict occurred from assigning")
-                    break
-
-            #repeat until F has no unit clause
-            if not has_unit_clause:
-                print("unit propagation complete, with no conflict")
-                break
+                if debug and mode != DECISION_DFS:
+                    log.debug(f"backjumping from level {trail.decisionLevel()} to level {backjump_level}")
 
-        if print_clause:
-            print("assign result - ", end="")
-            print(f"empty clause : {is_conflict} ")
-
-        # If F|A contains an empty clause,
-        # Find a clause C by learning procedure & add it to F.
-        # do the following:
-        if is_conflict:
-            print("enter conflict handling")
-            print(f"conflict clause : {conflict_clauses[0]}")
-            # Suppose A = {p1->b1, ... , pk->bk} leads to conflict.
-            # Pick any conflict clause D_k+1 under A.
-            #assert len(A) == k
-
-            i = len(A)
-            Di = conflict_clauses[0]
-
-            if DECISION_MODE == DECISION_RESTART:
-                conflict_level = len(order)
-                if len(conflict_buffer) < conflict_buffer_size:
-                    minimal_conflict_number += int(conflict_level < minimal_conflict_level)
-                    conflict_buffer.append(conflict_level)
-                else:
-                    minimal_conflict_number += int(conflict_level < minimal_conflict_level) \
-                                                - int(conflict_buffer[0] < minimal_conflict_level)
-                    conflict_buffer = conflict_buffer[1:] + [conflict_level]
-
-            while i > 0:
-                # D means Di+1 in this loop
-                # If pi -> bi is a decision assignment or pi is not mentioned in Di+1,
-                # set Di = Di+1.
-
-                item = list(A.values())[i-1]
-                ind = item.ind
-                if item.assignmentType == TYPE_DECISION or not Di.isInvolved(ind):
-                    i -= 1
-                # If pi -Ci-> bi is an implied assignment and pi is mentioned in Di+1,
-                # define Di to be a resolvent of Ci and Di+1 with respect to pi.
-                elif item.assignmentType == TYPE_IMPLIED and Di.isInvolved(ind):
-                    Ci = item.impliedClause
-                    Di = resolvent(Ci, Di)
-                    i -= 1
-                else:
-                    raise ValueError
-
-            # The final clause D1 is the learned clause.
-            # A learned clause is added to F.
-            # If a learned clause is empty, return UNSAT.
-            learned_clause = Di
-            if learned_clause.isEmpty():
-                print("learned clause empty, returning unsat")
-                return {}, False
-            print(f"added learned clause : {learned_clause}\n")
-            # should set the cid to ++num_of_clauses
-            # so that it can be used in another backtracking
-            num_of_clauses += 1
-            learned_clause.cid = num_of_clauses
-            learned_clause.parentid = num_of_clauses
-            # add learned clause
-            clauses.append(learned_clause)
-
-            # Go back to the last moment when all other variables of D1 was
-            # eliminated and D1 became a unit clause.
-            # need a memorial data structure (list 'order')
-            remove_inds = None
-            assert list(A.keys()) == order
-            print(f"order : {order}")
-
-            learned_inds = learned_clause.getIndexOfLiterals()
-            l = len(learned_inds)
-
-            # backtracking in tree. todo
-            # set obsolete last decision first
-            if DECISION_MODE == DECISION_DFS:
-                print("backtrcking in the search tree...")
-                tree_pos = tree_pos.parent
-                if A[order[-1]].value == True:
-                    tree_pos.setObsoleteTrue()
-                    print(f"the left section of node {tree_pos.ind} is now obsolete")
-                else:
-                    tree_pos.setObsoleteFalse()
-                    print(f"the right section of node {tree_pos.ind} is now obsolete")
-
-                while True:
-                    print(f"current tree pos : {tree_pos.ind}")
-                    assert tree_pos != tree.head
-                    assert tree_pos.ind is not None
-                    if tree_pos.ind in learned_inds:
-                        break
+                propagator.cancelUntil(backjump_level)
+                hooked = min(hooked, len(order))
+                while tree_depth > len(order):
                     tree_pos = tree_pos.parent
+                    tree_depth -= 1
+                if debug and mode == DECISION_DFS:
+                    log.debug(f"current tree pos : {tree_pos.ind}")
+
+                # D1 watches its unit literal and the last assigned one of the others,
+                # and the unit literal is implied right away.
+                cref = db.add(lits, num_of_clauses, learnt=True, lbd=lbd)
+                self.learned_clauses += 1
+                propagator.attach(cref)
+                trail.imply(lits[0] >> 1, not (lits[0] & 1), cref)
+                if exchange is not None:
+                    exchange.export(lits)
 
-            if l != 1:
-                for i, order_ind in enumerate(order):
-                    if order_ind in learned_inds:
-                        learned_inds.remove(order_ind)
-                        if len(learned_inds) <= 1: # right time
-                            remove_inds = order[i+1:]
-                            break
             else:
-                i = order.index(list(learned_inds)[0])
-                remove_inds = order[i:]
-
-            if DECISION_MODE != DECISION_DFS:
-                print(f"removed variable {remove_inds} from A to go to unit propagation")
+                # if not in conflict nor successful, make a decision
+                if restart_policy is not None and restart_policy.shouldRestart():
+                    # only the assignments above level 0, or above the reused levels, are undone.
+                    # learned clauses and the decision heuristic are kept.
+                    if info:
+                        log.info(f"restarting search ({restart_policy})")
+                    propagator.cancelUntil(self.reuseLevel(assumptions))
+                    hooked = min(hooked, len(order))
+                    restart_policy.onRestart()
+                    self.restarts += 1
+                    # the next target is the longest trail from this restart on
+                    self.target_size = 0
+                    if exchange is not None:
+                        # clauses learned by the other workers are added at level 0
+                        for lits in exchange.receive():
+                            num_of_clauses += 1
+                            if not propagator.addAtRoot(lits, num_of_clauses):
+                                log.info("shared clause is false at level 0, returning unsat")
+                                self.ok = False
+                                return False
+                    continue
+
+                over_limit = self.learned_clauses > self.reduced_learned and \
+                    (db.num_learnts > config.max_learnts or db.learntMemory() > config.max_learnt_memory)
+                if self.conflicts >= self.next_reduce or over_limit:
+                    # learned clauses are kept in the database only while they are useful
+                    num_learnts = db.num_learnts
+                    if over_limit:
+                        propagator.reduceDB(False, config.max_learnts, config.max_learnt_memory)
+                    else:
+                        propagator.reduceDB()
+                    self.reductions += 1
+                    self.reduced_learned = self.learned_clauses
+                    self.next_reduce = self.conflicts + config.reduce_first + config.reduce_inc * self.reductions
+                    if info:
+                        log.info(f"reduced learned clauses from {num_learnts} to {db.num_learnts}")
+
+                if phases and config.rephase_interval and self.conflicts >= self.next_rephase:
+                    self.rephase()
+
+                if trail.decisionLevel() < len(assumptions):
+                    # the assumptions are the first decisions, and are made again after a backjump
+                    lit = assumptions[trail.decisionLevel()]
+                    a = A.get(lit >> 1)
+                    if a is None:
+                        trail.decide(lit >> 1, not (lit & 1))
+                    elif a.value != (lit & 1):
+                        # already true : the level has no assignment
+                        trail.newLevel()
+                    else:
+                        self.core = self.analyzeFinal(lit)
+                        log.info("assumption is false, returning unsat")
+                        return False
+                    continue
+
+                if debug:
+                    log.debug("enter decision strategy")
+                if mode == DECISION_NAIVE:
+                    # naive : make a var with the smallest index with random value
+                    # todo : propose a better strategy
+                    for decision_ind in ind_lists:
+                        if decision_ind not in A.keys():
+                            rand = self.random.random()
+                            trail.decide(decision_ind, True if rand > 0.5 else False)
 
-            # remove some variable allocation from assignment
-            # to make D1 a unit clause
+                            if trace:
+                                log.log(TRACE, f"assigning new from strategy : {decision_ind}, {True if rand > 0.5 else False}")
+                            break
 
-            assert remove_inds is not None
-            for remove_ind in remove_inds:
-                order.pop(-1)
-                A.pop(remove_ind)
+                elif mode == DECISION_DFS:
+                    # dfs : select the remaining clause according to the dfs path
+
+                    # if no index is set to the node, or an assigned one, find the smallest unassigned index
+                    if tree_pos.ind is None or tree_pos.ind in A:
+                        for decision_ind in ind_lists:
+                            if decision_ind not in A.keys():
+                                tree_pos.setInd(decision_ind)
+                                rand = self.random.random()
+                                trail.decide(decision_ind, True if rand > 0.5 else False)
+                                newnode = Node()
+                                is_left = rand > 0.5
+                                tree_pos.connect(newnode, is_left = is_left)
+                                if trace:
+                                    log.log(TRACE, f"assigning new from strategy : {decision_ind}, {is_left}")
+                                tree_pos = newnode
+                                tree_depth += 1
+                                break
 
-            # should re-initialize F
-            F = assign(clauses, clauses, A)[0]
+                    else:
+                        newnode = Node()
+                        decision_ind = tree_pos.ind
 
-        else:
-            # if not in conflict nor successful, make a decision
-            print("enter decision strategy")
-            #printAssignments(A)
-            if DECISION_MODE == DECISION_NAIVE:
-                # naive : make a var with the smallest index with random value
-                # todo : propose a better strategy
-                for decision_ind in ind_lists:
-                    if decision_ind not in A.keys():
-                        rand = random.random()
-                        A[decision_ind] = Assignment(decision_ind,
-                            True if rand > 0.5 else False, TYPE_DECISION)
-
-                        if print_assign:
-                            print(f"assigning new from strategy : {decision_ind}, {True if rand > 0.5 else False}")
-                        order.append(decision_ind)
-                        break
+                        #forced assignment
+                        if tree_pos.obsoleteTrue:
+                            trail.decide(decision_ind, False)
+                        elif tree_pos.obsoleteFalse:
+                            trail.decide(decision_ind, True)
+                        else:
+                            trail.decide(decision_ind, True)
+                        is_left = A[decision_ind].value
+                        tree_pos.connect(newnode, is_left= is_left)
+                        if trace:
+                            log.log(TRACE, f"assigning new from strategy : {decision_ind}, {is_left}")
+                        tree_pos = newnode
+                        tree_depth += 1
 
-            elif DECISION_MODE == DECISION_DFS:
-                # dfs : select the remaining clause according to the dfs path
+                # ----------------- todo. modify these to fit the tree structure ---------------------
 
-                # if no index is set to the node, find the smallest unassigned index
-                if tree_pos.ind is None:
+                elif mode == DECISION_GREEDY_APPEARANCE:
+                    # greedy : make true when normal appearance > negation appearance
+                    # make false when opposite situation
+                    F = remaining_clauses(db, A)
                     for decision_ind in ind_lists:
                         if decision_ind not in A.keys():
-                            tree_pos.setInd(decision_ind)
-                            rand = random.random()
-                            A[decision_ind] = Assignment(decision_ind,
-                                    True if rand > 0.5 else False, TYPE_DECISION)
-                            newnode = Node()
-                            is_left = rand > 0.5
-                            tree_pos.connect(newnode, is_left = is_left)
-                            if print_assign:
-                                print(f"assigning new from strategy : {decision_ind}, {is_left}")
-                            tree_pos = newnode
-                            order.append(decision_ind)
+                            normal_app, neg_app = 0, 0
+                            for remain_clause in F:
+                                if remain_clause.getSign(decision_ind) == 1:
+                                    normal_app += 1
+                                if remain_clause.getSign(decision_ind) == -1:
+                                    neg_app += 1
+                            rand = self.random.random()
+                            # a variable left only in satisfied clauses has no preference
+                            ratio = normal_app / (normal_app+neg_app) if normal_app + neg_app > 0 else 0.5
+                            trail.decide(decision_ind, True if rand < ratio else False)
                             break
 
-                else:
-                    newnode = Node()
-                    decision_ind = tree_pos.ind
-
-                    #forced assignment
-                    if tree_pos.obsoleteTrue:
-                        A[decision_ind] = Assignment(decision_ind, False, TYPE_DECISION)
-                    elif tree_pos.obsoleteFalse:
-                        A[decision_ind] = Assignment(decision_ind, True, TYPE_DECISION)
+                elif mode == DECISION_GREEDY_SIZE:
+                    # greedy : select the remaining clause with minimal size
+                    # and make all the variable's value according to the sign of it in the clause
+                    F = remaining_clauses(db, A)
+                    if F == []:
+                        log.info("found satisfying assignment")
+                        return True
+                    min_clause = F[0]
+                    for decision_lit in min_clause.literals.values():
+                        decision_ind = decision_lit.ind
+                        trail.decide(decision_ind, True if not decision_lit.isNegation else False)
+
+                elif mode == DECISION_VSIDS:
+                    # vsids : the free variable that took part in the most recent conflicts,
+                    # with its target phase or its saved phase, negative at first
+                    decision_ind = var_order.pick(A)
+                    value = False
+                    if target_phase and target[decision_ind] != NO_PHASE:
+                        value = target[decision_ind] == 1
+                    elif phases:
+                        value = phase[decision_ind] == 1
+                    trail.decide(decision_ind, value)
+                    if trace:
+                        log.log(TRACE, f"assigning new from strategy : {decision_ind}, {value}")
+
+                elif mode == DECISION_RESTART:
+                    rand = self.random.random()
+                    value = rand > (recent_avg if recent_buffer != [] else 0.5)
+                    if len(recent_buffer) < recent_buffer_size:
+                        recent_buffer.append(value)
+                        recent_avg = sum(recent_buffer) / recent_buffer_size
                     else:
-                        A[decision_ind] = Assignment(decision_ind, True, TYPE_DECISION)
-                    is_left = A[decision_ind].value
-                    tree_pos.connect(newnode, is_left= is_left)
-                    if print_assign:
-                        print(f"assigning new from strategy : {decision_ind}, {is_left}")
-                    tree_pos = newnode
-                    order.append(decision_ind)
-
-            # ----------------- todo. modify these to fit the tree structure ---------------------
-
-            elif DECISION_MODE == DECISION_GREEDY_APPEARANCE:
-                # greedy : make true when normal appearance > negation appearance
-                # make false when opposite situation
-                for decision_ind in ind_lists:
-                    if decision_ind not in A.keys():
-                        normal_app, neg_app = 0, 0
-                        for remain_clause in F:
-                            if remain_clause.getSign(decision_ind) == 1:
-                                normal_app += 1
-                            if remain_clause.getSign(decision_ind) == -1:
-                                neg_app += 1
-                        rand = random.random()
-                        A[decision_ind] = Assignment(decision_ind,
-                                True if rand < normal_app / (normal_app+neg_app) else False, TYPE_DECISION)
-                        order.append(decision_ind)
-                        break
+                        recent_buffer = recent_buffer[1:] + [value]
+                        recent_avg += (value - recent_buffer[0]) / recent_buffer_size
+                        variance = sum((x - recent_avg) ** 2 for x in recent_buffer) / len(recent_buffer)
+
+                        to_restart = False
+                        # have to restart when low variance
+                        if variance < (50 * k) / n:
+                            log.info("restarting search due to low variance")
+                            to_restart = True
+                        if minimal_conflict_number > conflict_buffer_size * 0.5:
+                            log.info("restarting search due to many low level conflicts")
+                            to_restart = True
+
+                        if to_restart and remaining_clauses(db, A) == []:
+                            # nothing is left to decide, even though some variables are free
+                            log.info("found satisfying assignment")
+                            return True
+
+                        if to_restart:
+                            # only the assignments above level 0 are undone,
+                            # learned clauses are kept
+                            propagator.cancelUntil(0)
+                            hooked = min(hooked, len(order))
+                            self.restarts += 1
+                            recent_buffer = []
+                            conflict_buffer = []
+                            minimal_conflict_number = 0
+                            continue
 
-            elif DECISION_MODE == DECISION_GREEDY_SIZE:
-                # greedy : select the remaining clause with minimal size
-                # and make all the variable's value according to the sign of it in the clause
-                min_clause = F[0]
-                for decision_lit in min_clause.literals.values():
-                    decision_ind = decision_lit.ind
-                    A[decision_ind] = Assignment(decision_ind,
-                            True if not decision_lit.isNegation else False, TYPE_DECISION)
-                    order.append(decision_ind)
-
-            elif DECISION_MODE == DECISION_RESTART:
-                rand = random.random()
-                value = rand > (recent_avg if recent_buffer != [] else 0.5)
-                if len(recent_buffer) < recent_buffer_size:
                     for decision_ind in ind_lists:
                         if decision_ind not in A.keys():
-                            A[decision_ind] = Assignment(decision_ind, value, TYPE_DECISION)
-                            if print_assign:
-                                print(f"assigning new from strategy : {decision_ind}, {value}")
-                            order.append(decision_ind)
-                            recent_buffer.append(value)
-                            recent_avg = sum(recent_buffer) / recent_buffer_size
+                            trail.decide(decision_ind, value)
+                            if trace:
+                                log.log(TRACE, f"assigning new from strategy : {decision_ind}, {value}")
                             break
-                else:
-                    recent_buffer = recent_buffer[1:] + [value]
-                    recent_avg += (value - recent_buffer[0]) / recent_buffer_size
-                    variance = sum((x - recent_avg) ** 2 for x in recent_buffer) / len(recent_buffer)
-
-                    to_restart = False
-                    # have to restart when low variance
-                    if variance < (50 * k) / n:
-                        print(f"restarting search due to low variance")
-                        to_restart = True
-                    if minimal_conflict_number > conflict_buffer_size * 0.5:
-                        print(f"restarting search due to many low level conflicts")
-                        to_restart = True
-
-                    if to_restart:
-                        # should flush everything
-
-                        F = copy.deepcopy(clauses)
-                        A = {}
-                        order = []
-                        recent_buffer = []
-                        conflict_buffer = []
-                        minimal_conflict_number = 0
-
-
-
@@ -1,42 +1,12 @@
 from solver import *
+from dimacs import read_dimacs
+from verify import format_model
 import sys
 import os
 
 BATCH = 10
 def read_cnf_from_file(filename):
-    with open(filename, 'r') as file:
-        comments = ""
-        lines = file.readlines()
-        comment_len = 0
-        for line in lines:
-            line = line.split(" ")
-            comment_len += 1
-            # comment
-            if line[0] == "c":
-                comments += line[0] + '\n'
-            elif line[0] == "p":
-                # format : p cnf k n
-                assert len(line) == 4
-                assert line[1] == "cnf"
-                k, n = int(line[2]), int(line[3])
-                break
-
-        Formula = []
-        for i in range(n-1):
-            line = lines[i + comment_len]
-            line = line.split(" ")
-
-            # increasing order (by abs)
-            indexes = line[:-1]
-            indexes.sort(key=lambda x: abs(int(x)))
-
-            clause = Clause(cid=i, parentid=i)
-            for j in indexes:
-                clause.addLiteral(
-                    Literal(abs(int(j)) - 1, True if j[0] == '-' else False))
-            Formula.append(clause)
-
-        return Formula, n, k
+    return read_dimacs(filename)
 
 if __name__ == '__main__':
     directory = './sat_inputs_small'
@@ -54,12 +24,7 @@ if __name__ == '__main__':
             s = "SATISFIABLE" if solve_result[1] else "UNSATISFIABLE"
             print(f"s {s}")
             if s == "SATISFIABLE":
-                print("v ", end='')
-                ret = ""
-                for assignment in solution.values():
-                    if assignment.value == False:
-                        ret += str(assignment.ind+1) + " "
-                print(f"{ret}0")
+                print(format_model(solution, k))
     end_time = time.time()
     elapsed_time = end_time - start_time
 
@@ -0,0 +1,439 @@
+import gzip
+import io
+import itertools
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import solver
+from solver import Budget, Config, decisions
+from bitsolver import solve_small
+from cache import ResultCache, cached_solve
+from dimacs import read_dimacs
+from localsearch import LocalSearch, solve_local
+from portfolio import solve_portfolio
+from preprocess import preprocess
+from proof import DratWriter
+from verify import ModelChecker, verify
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# regression tests, cross-checked against brute force on small random formulas.
+# run with pytest, or as a script
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+FORMULAS = 40
+
+def random_formula(rng, k, m):
+    # clauses of 3 dimacs literals over k variables
+    return [[v if rng.random() < 0.5 else -v for v in rng.sample(range(1, k + 1), 3)] for _ in range(m)]
+
+def formulas(count = FORMULAS, seed = 0):
+    # random 3-sat around the threshold, so that about half of the formulas are satisfiable
+    rng = random.Random(seed)
+    for _ in range(count):
+        k = rng.randint(5, 12)
+        yield random_formula(rng, k, round(k * rng.uniform(3.5, 5.5))), k
+
+def to_dimacs(clauses, k):
+    lines = [f"p cnf {k} {len(clauses)}"] + [" ".join(map(str, clause)) + " 0" for clause in clauses]
+    return ("\n".join(lines) + "\n").encode()
+
+def load(clauses, k):
+    return read_dimacs(io.BytesIO(to_dimacs(clauses, k)))
+
+def brute_force(clauses, k):
+    """
+    :return: whether some assignment of the k variables satisfies clauses
+    """
+    for values in itertools.product((False, True), repeat=k):
+        if all(any(values[abs(v) - 1] == (v > 0) for v in clause) for clause in clauses):
+            return True
+    return False
+
+def check_answer(clauses, k, A, is_sat):
+    assert is_sat == brute_force(clauses, k)
+    if is_sat:
+        db, _, _ = load(clauses, k)
+        assert not verify(db, k, A)
+
+def test_parser():
+    text = b"c comment\np cnf 4 3\n1 -2\n 3 0 -4\n\t0\n2 3 4 0\n"
+    with tempfile.TemporaryDirectory() as directory:
+        sources = [io.BytesIO(text)]
+        for name, data in (('plain.cnf', text), ('packed.cnf.gz', gzip.compress(text))):
+            sources.append(os.path.join(directory, name))
+            with open(sources[-1], 'wb') as file:
+                file.write(data)
+        for source in sources:
+            db, n, k = read_dimacs(source)
+            assert (n, k) == (3, 4)
+            clauses = [sorted(db.literalsOf(cref)) for cref in range(len(db))]
+            assert clauses == [[0, 3, 4], [7], [2, 4, 6]]
+    # the last clause may miss its 0, and repeated literals are dropped
+    db, n, k = read_dimacs(io.BytesIO(b"p cnf 2 1\n1 1 -2"))
+    assert (n, k) == (1, 2) and list(db.literalsOf(0)) == [0, 3]
+
+def test_generator():
+    if np is None:
+        # the generator samples with numpy
+        return
+    import sat_generator
+    from sat_generator import uniform_ksat, planted_ksat, community_ksat, write_dimacs
+
+    def dimacs(seed, k):
+        rng = np.random.default_rng(seed)
+        solution, planted = planted_ksat(rng, 60, 300, k)
+        kinds = [np.concatenate(list(uniform_ksat(rng, 60, 300, k))), np.concatenate(list(planted)),
+                 np.concatenate(list(community_ksat(rng, 60, 300, k, communities=6)))]
+        texts = []
+        for clauses in kinds:
+            out = io.StringIO()
+            write_dimacs(out, 60, len(clauses), [clauses], comments=["generated"])
+            texts.append(out.getvalue())
+        return solution, kinds, texts
+
+    chunk = sat_generator.CHUNK_CLAUSES
+    # several chunks per formula
+    sat_generator.CHUNK_CLAUSES = 64
+    try:
+        for k in (3, 5):
+            solution, kinds, texts = dimacs(k, k)
+            for clauses, text in zip(kinds, texts):
+                assert clauses.shape == (300, k)
+                # k distinct variables of 1..60 per clause
+                variables = np.sort(np.abs(clauses), axis=1)
+                assert variables.min() >= 1 and variables.max() <= 60
+                assert (variables[:, 1:] != variables[:, :-1]).all()
+                db, n, num_variables = read_dimacs(io.BytesIO(text.encode()))
+                assert (n, num_variables) == (300, 60)
+                encoded = [sorted(2 * (abs(v) - 1) + (v < 0) for v in clause) for clause in clauses.tolist()]
+                assert [sorted(db.literalsOf(cref)) for cref in range(len(db))] == encoded
+            # the planted solution satisfies every clause
+            values = np.where(solution, 1, -1) * np.arange(1, 61)
+            assert all(set(clause) & set(values.tolist()) for clause in kinds[1].tolist())
+            # the same seed gives the same formulas
+            assert dimacs(k, k)[2] == texts
+    finally:
+        sat_generator.CHUNK_CLAUSES = chunk
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, solution = os.path.join(directory, 'planted.cnf'), os.path.join(directory, 'solution')
+        sat_generator.main(['planted', '-n', '30', '-s', '1', '-o', path, '--solution', solution])
+        db, n, k = read_dimacs(path)
+        assert (n, k) == (round(sat_generator.THRESHOLDS[3] * 30), 30)
+        with open(solution) as file:
+            values = [int(v) for v in file.read().split()[1:-1]]
+        A = {abs(v) - 1: solver.Assignment(abs(v) - 1, v > 0, solver.TYPE_DECISION) for v in values}
+        assert not verify(db, k, A)
+
+def test_empty_formula():
+    db, n, k = read_dimacs(io.BytesIO(b"p cnf 0 0\n"))
+    assert (n, k) == (0, 0)
+    assert solver.solve(db, n, k)[1] is True
+    assert ModelChecker(db, k).check_batch([]) == []
+    assert verify(db, k, {}) == []
+    db, n, k = read_dimacs(io.BytesIO(b"p cnf 0 1\n0\n"))
+    assert solver.solve(db, n, k)[1] is False
+    assert verify(db, k, {}) == [0]
+    for text, answer in ((b"p cnf 0 0\n", "s SATISFIABLE"), (b"p cnf 0 1\n0\n", "s UNSATISFIABLE")):
+        result = subprocess.run([sys.executable, 'main.py'], input=text, capture_output=True, cwd=DIRECTORY)
+        assert result.returncode == 0, result.stderr
+        assert answer in result.stdout.decode().splitlines()
+
+def test_modes():
+    # every mode asked for is used, whatever the size of the formula
+    for mode in sorted(decisions):
+        # the portfolio and the cubes start processes, and local search flips for long on unsat formulas,
+        # so they get fewer formulas
+        count = 4 if mode in (solver.DECISION_MULTITHREAD, solver.DECISION_CUBE, solver.DECISION_LOCAL) else FORMULAS
+        for clauses, k in formulas(count, seed=mode):
+            db, n, _ = load(clauses, k)
+            # without preprocessing, which could answer before the mode is used
+            A, is_sat = solver.solve(db, n, k, config=Config(1, decision_mode=mode, preprocess=False))
+            check_answer(clauses, k, A, is_sat)
+    # a formula refuted by the lookahead, before any cube is solved, still has every counter
+    db, n, k = read_dimacs(os.path.join(DIRECTORY, 'sat_inputs_small', 'input_10vars_100clauses_0.cnf'))
+    stats = {}
+    config = Config(1, decision_mode=solver.DECISION_CUBE, preprocess=False)
+    assert solver.solve(db, n, k, stats, config=config)[1] is False
+    assert set(solver.STATS) <= set(stats)
+
+def test_phases():
+    for target_phase, rephase_interval in ((True, 0), (True, 10), (False, 10)):
+        config = Config(1, decision_mode=solver.DECISION_VSIDS, target_phase=target_phase,
+                        rephase_interval=rephase_interval, preprocess=False)
+        for clauses, k in formulas():
+            db, n, _ = load(clauses, k)
+            A, is_sat = solver.solve(db, n, k, config=config)
+            check_answer(clauses, k, A, is_sat)
+
+def test_reduce():
+    # reductions and compactions from the first conflicts on, by the interval and by both ceilings
+    for settings in (dict(reduce_first=2, reduce_inc=1), dict(max_learnts=3), dict(max_learnt_memory=200)):
+        for mode in (solver.DECISION_NAIVE, solver.DECISION_RESTART, solver.DECISION_VSIDS):
+            reductions = 0
+            for clauses, k in formulas(seed=mode):
+                db, n, _ = load(clauses, k)
+                stats = {}
+                A, is_sat = solver.solve(db, n, k, stats, config=Config(1, decision_mode=mode, preprocess=False,
+                                                                        **settings))
+                check_answer(clauses, k, A, is_sat)
+                assert stats['reductions'] <= stats['conflicts']
+                reductions += stats['reductions']
+            assert reductions
+    # a ceiling which locked clauses keep exceeded forced a reduction at every decision
+    db, n, k = read_dimacs(os.path.join(DIRECTORY, '7_UNSAT.cnf'))
+    stats = {}
+    config = Config(1, decision_mode=solver.DECISION_VSIDS, preprocess=False, max_learnts=10)
+    assert solver.solve(db, n, k, stats, budget=Budget(conflicts=200), config=config)[1] is None
+    assert stats['reductions'] <= stats['conflicts']
+
+def test_small_engine():
+    for clauses, k in formulas():
+        db, n, _ = load(clauses, k)
+        stats = {}
+        A, is_sat = solve_small(db, n, k, stats)
+        check_answer(clauses, k, A, is_sat)
+        assert set(solver.STATS) <= set(stats)
+        # the default mode routes small formulas to it
+        assert solver.solve(db, n, k)[1] == is_sat
+
+def test_small_engine_budget():
+    db, n, k = read_dimacs(os.path.join(DIRECTORY, '8_UNSAT.cnf'))
+    for budget in (Budget(conflicts=1), Budget(propagations=10), Budget(time=0), Budget(memory=1)):
+        stats = {}
+        assert solver.solve(db, n, k, stats, budget=budget)[1] is None
+        assert stats['conflicts'] <= (budget.conflicts or stats['conflicts'])
+    reports = []
+    config = Config(progress_period=0)
+    assert solve_small(db, n, k, budget=Budget(), progress=reports.append, config=config)[1] is False
+    assert reports
+    result = subprocess.run([sys.executable, 'main.py', '8_UNSAT.cnf', '--conflicts', '1'],
+                            capture_output=True, cwd=DIRECTORY)
+    lines = result.stdout.decode().splitlines()
+    assert "s UNKNOWN" in lines
+    assert any(line.split() == ['c', 'conflicts', ':', '1'] for line in lines)
+
+def test_local_search():
+    for clauses, k in formulas():
+        db, n, _ = load(clauses, k)
+        values = LocalSearch(db, k, random.Random(1)).walk(tries=2, max_flips=1000)
+        if values is not None:
+            assert brute_force(clauses, k)
+            assert not verify(db, k, values)
+    # unsat formulas are left to cdcl after the local search
+    for clauses, k in formulas(4, seed=1):
+        db, n, _ = load(clauses, k)
+        A, is_sat = solve_local(db, n, k, config=Config(1))
+        check_answer(clauses, k, A, is_sat)
+    # the budget stops the flips of a try, and a portfolio whose local search cannot count conflicts
+    db, n, k = read_dimacs(os.path.join(DIRECTORY, '7_UNSAT.cnf'))
+    start = time.time()
+    assert LocalSearch(db, k, random.Random(1)).walk(budget=Budget(time=0.1)) is None
+    assert time.time() - start < 0.5
+    assert solve_portfolio(db, n, k, workers=3, budget=Budget(conflicts=5), config=Config(1))[1] is None
+
+def test_threads():
+    # solves with their own configs in threads answer and count as they do one after another
+    modes = (solver.DECISION_NAIVE, solver.DECISION_RESTART, solver.DECISION_VSIDS)
+    jobs = [(clauses, k, Config(1, decision_mode=mode, preprocess=False))
+            for mode in modes for clauses, k in formulas(10, seed=mode)]
+
+    def run(clauses, k, config, results, i):
+        db, n, _ = load(clauses, k)
+        stats = {}
+        A, is_sat = solver.solve(db, n, k, stats, config=config)
+        check_answer(clauses, k, A, is_sat)
+        results[i] = (is_sat, stats['decisions'], stats['conflicts'])
+
+    expected = [None] * len(jobs)
+    for i, job in enumerate(jobs):
+        run(*job, expected, i)
+    results = [None] * len(jobs)
+    threads = [threading.Thread(target=run, args=(*job, results, i)) for i, job in enumerate(jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == expected
+
+def test_incremental():
+    rng = random.Random(3)
+    for clauses, k in formulas():
+        s = solver.Solver(config=Config(1, decision_mode=solver.DECISION_VSIDS))
+        for clause in clauses:
+            s.add_clause(clause)
+        for _ in range(3):
+            assumptions = [v if rng.random() < 0.5 else -v for v in rng.sample(range(1, k + 1), 2)]
+            is_sat = s.solve(assumptions)
+            assert is_sat == brute_force(clauses + [[v] for v in assumptions], k)
+            if is_sat:
+                assert all(s.model[abs(v) - 1].value == (v > 0) for v in assumptions)
+            else:
+                assert set(s.core) <= set(assumptions)
+    # the modes which solve runs outside of a Solver would never decide
+    for mode in (solver.DECISION_MULTITHREAD, solver.DECISION_CUBE, solver.DECISION_LOCAL):
+        try:
+            solver.Solver(config=Config(1, decision_mode=mode))
+        except ValueError:
+            continue
+        assert False, f"Solver accepted the {decisions[mode]} mode"
+
+def test_preprocess():
+    for clauses, k in formulas():
+        db, n, _ = load(clauses, k)
+        simplified, preprocessor = preprocess(db, k)
+        if simplified is None:
+            assert not brute_force(clauses, k)
+            continue
+        A, is_sat = solver.search(simplified, n, k, config=Config(1, decision_mode=solver.DECISION_VSIDS))
+        if is_sat:
+            preprocessor.extendModel(A)
+        check_answer(clauses, k, A, is_sat)
+    # an interrupted preprocessing leaves the formula as it is, and the solve unknown
+    db, n, k = read_dimacs(os.path.join(DIRECTORY, '8_UNSAT.cnf'))
+    budget = Budget()
+    budget.interrupt()
+    simplified, preprocessor = preprocess(db, k, budget=budget)
+    assert simplified is db and preprocessor.stopped == 'interrupted'
+    # the time and memory are checked every budget_check steps of the config
+    for budget in (Budget(time=0), Budget(memory=1)):
+        simplified, preprocessor = preprocess(db, k, budget=budget, config=Config(budget_check=1))
+        assert simplified is db and preprocessor.stopped is not None
+    assert solver.solve(db, n, k, budget=budget, config=Config(1, small_formula_vars=0))[1] is None
+
+def test_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cache.sqlite')
+        for clauses, k in formulas(10):
+            db, n, _ = load(clauses, k)
+            with ResultCache(path=path, rename=True) as cache:
+                stats = {}
+                A, is_sat = cached_solve(db, n, k, cache, stats)
+                check_answer(clauses, k, A, is_sat)
+            # a renaming of the formula is answered from the store, with the model mapped back
+            rng = random.Random(k)
+            names = list(range(1, k + 1))
+            rng.shuffle(names)
+            renamed = [[names[abs(v) - 1] * (1 if v > 0 else -1) for v in clause] for clause in clauses]
+            rng.shuffle(renamed)
+            db, n, _ = load(renamed, k)
+            with ResultCache(path=path, rename=True) as cache:
+                stats = {}
+                A, is_sat = cached_solve(db, n, k, cache, stats)
+                check_answer(renamed, k, A, is_sat)
+                assert stats['cache_hit']
+    # a solve missing from the cache runs with the config given
+    config = Config(1, decision_mode=solver.DECISION_NAIVE, preprocess=False)
+    for clauses, k in formulas(10, seed=1):
+        db, n, _ = load(clauses, k)
+        expected, stats = {}, {}
+        solver.solve(db, n, k, expected, config=config)
+        with ResultCache() as cache:
+            cached_solve(db, n, k, cache, stats, config=config)
+        assert not stats['cache_hit']
+        assert all(stats[name] == expected[name] for name in ('decisions', 'conflicts', 'propagations'))
+
+def propagates_to_conflict(clauses, assigned):
+    # unit propagation from the dimacs literals of assigned, which are true
+    assigned = set(assigned)
+    changed = True
+    while changed:
+        changed = False
+        for clause in clauses:
+            if any(v in assigned for v in clause):
+                continue
+            free = [v for v in clause if -v not in assigned]
+            if not free:
+                return True
+            if len(free) == 1:
+                assigned.add(free[0])
+                changed = True
+    return False
+
+def check_drat(clauses, proof):
+    """
+    check a text drat proof of unsatisfiability : every added clause is rup, or rat on its first literal,
+    and the empty clause is added
+    """
+    current = [list(clause) for clause in clauses]
+    for line in proof.decode().splitlines():
+        words = line.split()
+        if words[0] == 'd':
+            lemma = set(map(int, words[1:-1]))
+            current.pop(next(i for i, clause in enumerate(current) if set(clause) == lemma))
+            continue
+        lemma = list(map(int, words[:-1]))
+        rup = propagates_to_conflict(current, [-v for v in lemma])
+        if not rup:
+            assert lemma, "the empty clause is not rup"
+            first = lemma[0]
+            for clause in current:
+                if -first in clause:
+                    resolvent = lemma + [v for v in clause if v != -first]
+                    assert propagates_to_conflict(current, [-v for v in resolvent]), f"{lemma} is not rat"
+        if not lemma:
+            return
+        current.append(lemma)
+    assert False, "the proof has no empty clause"
+
+def test_drat():
+    buffer = io.BytesIO()
+    with DratWriter(buffer) as writer:
+        writer.add([0, 3])
+        writer.delete([4])
+    assert buffer.getvalue() == b"1 -2 0\nd 3 0\n"
+    assert not buffer.closed
+    buffer = io.BytesIO()
+    with DratWriter(buffer, binary=True) as writer:
+        writer.add([0, 3, 300])
+    assert buffer.getvalue() == b"a\x02\x05\xae\x02\x00"
+
+    for clauses, k in formulas():
+        if brute_force(clauses, k):
+            continue
+        for preprocess_clauses in (False, True):
+            db, n, _ = load(clauses, k)
+            buffer = io.BytesIO()
+            with DratWriter(buffer) as writer:
+                config = Config(1, decision_mode=solver.DECISION_VSIDS, preprocess=preprocess_clauses)
+                assert solver.solve(db, n, k, proof=writer, config=config)[1] is False
+            check_drat(clauses, buffer.getvalue())
+
+def test_proof_stdout():
+    result = subprocess.run([sys.executable, 'main.py', '8_UNSAT.cnf', '-p', '-'], capture_output=True, cwd=DIRECTORY)
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.decode().splitlines()
+    assert lines[-1] == "s UNSATISFIABLE"
+    assert "0" in lines
+
+def test_batch_timeout():
+    from batch import run_batch, TIMEOUT_GRACE
+    # the pigeonhole formula of 8 pigeons in 7 holes, far out of reach in a second
+    pigeons, holes = 8, 7
+    var = lambda p, h: p * holes + h + 1
+    clauses = [[var(p, h) for h in range(holes)] for p in range(pigeons)]
+    clauses += [[-var(p, h), -var(q, h)] for h in range(holes) for p in range(pigeons) for q in range(p)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'php.cnf')
+        with open(path, 'wb') as file:
+            file.write(to_dimacs(clauses, pigeons * holes))
+        for mode in (solver.DECISION_MULTITHREAD, solver.DECISION_CUBE):
+            start = time.time()
+            [result] = run_batch([path], 1, timeout=1, mode=mode)
+            assert result['status'] == 'TIMEOUT'
+            assert time.time() - start < 1 + TIMEOUT_GRACE + 2
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            start = time.time()
+            test()
+            print(f"{name} : ok ({time.time() - start:.2f} s)")
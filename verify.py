@@ -0,0 +1,108 @@
+import solver
+from solver import ClauseDB
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# literals x assignments evaluated at a time by check_batch
+CHECK_CHUNK = 1 << 24
+# literals per v line of a printed model
+MODEL_LINE = 20
+
+def model_values(A, k):
+    """
+    :param A: {index : Assignment}, {index : value}, or a sequence of the k values (1 / True for true)
+    :param k: num of variables
+    :return: bytearray of the k values, 1 for true. variables missing from A are false
+    """
+    if not isinstance(A, dict):
+        return bytearray(1 if value else 0 for value in A)
+    values = bytearray(k)
+    for ind, a in A.items():
+        if a if isinstance(a, bool) else a.value:
+            values[ind] = 1
+    return values
+
+class ModelChecker:
+    """
+    checks assignments against the input clauses of a ClauseDB (its learned clauses are left out).
+    the clauses are kept in csr form : the literals of the i-th clause are
+    lits[offsets[i]:offsets[i] + sizes[i]], so that an assignment, or a batch of them,
+    is checked with a few numpy passes over lits.
+    """
+    def __init__(self, db : ClauseDB, k):
+        self.db = db
+        self.k = k
+        self.crefs = [cref for cref in range(len(db)) if not db.learnt[cref]]
+        if np is None:
+            return
+        crefs = np.array(self.crefs, dtype=np.int64)
+        start = np.frombuffer(db.start, dtype=np.int32)[crefs].astype(np.int64)
+        self.sizes = np.frombuffer(db.size, dtype=np.int32)[crefs].astype(np.int64)
+        self.offsets = np.cumsum(self.sizes) - self.sizes
+        # literals of the clauses, gathered from the flat array of db
+        positions = np.repeat(start - self.offsets, self.sizes) + np.arange(int(self.sizes.sum()))
+        lits = np.frombuffer(db.lits, dtype=np.int32)[positions].astype(np.int64)
+        self.inds = lits >> 1
+        self.neg = (lits & 1).astype(np.uint8)
+        self.empty = self.sizes == 0
+
+    def _satisfied(self, true):
+        # true : (assignments, literals) truth of every literal -> (assignments, clauses) truth of every clause
+        # a false column is appended so that reduceat has a valid index for empty clauses at the end
+        true = np.concatenate((true, np.zeros((len(true), 1), dtype=bool)), axis=1)
+        satisfied = np.logical_or.reduceat(true, self.offsets, axis=1)
+        satisfied[:, self.empty] = False
+        return satisfied
+
+    def check(self, A):
+        """
+        :param A: assignment, as in model_values
+        :return: list of the crefs of the clauses not satisfied by A
+        """
+        return self.check_batch([A])[0]
+
+    def check_batch(self, batch):
+        """
+        :param batch: (assignments, k) array of values (1 for true), or a list of assignments as in model_values
+        :return: list with the list of the crefs of the clauses not satisfied, for every assignment
+        """
+        if np is None:
+            inputs = set(self.crefs)
+            falsified = []
+            for A in batch:
+                values = dict(enumerate(map(bool, model_values(A, self.k))))
+                falsified.append([cref for cref in solver.falsified_clauses(self.db, values) if cref in inputs])
+            return falsified
+        if not isinstance(batch, np.ndarray):
+            # the shape is given in full, as -1 cannot be inferred from an empty batch or k == 0
+            batch = np.array([np.frombuffer(model_values(A, self.k), dtype=np.uint8) for A in batch],
+                             dtype=np.uint8).reshape(len(batch), self.k)
+        if not self.crefs:
+            return [[] for _ in range(len(batch))]
+        crefs = np.array(self.crefs, dtype=np.int64)
+        rows = max(1, CHECK_CHUNK // max(1, len(self.inds)))
+        falsified = []
+        for first in range(0, len(batch), rows):
+            values = batch[first:first + rows].astype(np.uint8, copy=False)
+            satisfied = self._satisfied(values[:, self.inds] != self.neg)
+            for row in satisfied:
+                falsified.append(crefs[~row].tolist())
+        return falsified
+
+def verify(db : ClauseDB, k, A):
+    """
+    :return: list of the crefs of the input clauses of db not satisfied by the assignment A
+    """
+    return ModelChecker(db, k).check(A)
+
+def format_model(A, k, width = MODEL_LINE):
+    """
+    :param A: assignment, as in model_values
+    :return: the dimacs v lines of the values of every variable, ending with 0
+    """
+    literals = [str(ind + 1 if value else -ind - 1) for ind, value in enumerate(model_values(A, k))]
+    literals.append("0")
+    return "\n".join("v " + " ".join(literals[i:i + width]) for i in range(0, len(literals), width))